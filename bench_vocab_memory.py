@@ -0,0 +1,84 @@
+# Memory benchmark: vocabulary as a list of dicts vs. VocabularyStore
+#
+# The German/English strings are created up front and shared by both layouts,
+# so the numbers are the per-word cost of everything around the words.
+#
+# Usage: python bench_vocab_memory.py [number_of_words]
+
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+from vocab_store import VocabularyStore
+
+TOPICS = [
+    "Free conversation", "Daily activities", "Food and cooking",
+    "Travel and culture", "Work and career", "Hobbies and interests",
+    "Grammar practice", "Pronunciation training", "German culture"
+]
+DIFFICULTIES = ["Beginner", "Intermediate", "Advanced"]
+
+
+def make_words(count):
+    random.seed(42)
+    letters = "abcdefghijklmnopqrstuvwxyzäöüß"
+    words = []
+    for i in range(count):
+        german = "".join(random.choices(letters, k=random.randint(4, 12))) + str(i)
+        english = "".join(random.choices(letters[:26], k=random.randint(3, 10))) + str(i)
+        learned = datetime(2024, 1, 1) + timedelta(days=random.randint(0, 365))
+        words.append((german, english, learned, random.choice(DIFFICULTIES), random.choice(TOPICS)))
+    return words
+
+
+def build_dicts(words):
+    # Same shape as the entries extract_vocabulary_enhanced used to create
+    vocabulary = []
+    for german, english, learned, difficulty, topic in words:
+        vocabulary.append({
+            "german": german.strip(),
+            "english": english.strip(),
+            "date_learned": learned.strftime("%Y-%m-%d"),
+            "difficulty": difficulty,
+            "topic": topic,
+            "times_seen": 1,
+            "mastery_level": "Learning"
+        })
+    return vocabulary
+
+
+def build_store(words):
+    store = VocabularyStore(TOPICS)
+    for german, english, learned, difficulty, topic in words:
+        store.append(german.strip(), english.strip(), learned.date(), difficulty, topic)
+    return store
+
+
+def measure(builder, words):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = builder(words)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return result, allocated
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    words = make_words(count)
+
+    vocabulary, dict_bytes = measure(build_dicts, words)
+    store, store_bytes = measure(build_store, words)
+    assert VocabularyStore.from_records(vocabulary).to_records() == vocabulary
+    assert store.to_records() == vocabulary
+
+    print(f"Words:                 {count}")
+    print(f"List of dicts:         {dict_bytes / count:8.1f} bytes/word ({dict_bytes / 1024:.0f} KiB)")
+    print(f"VocabularyStore:       {store_bytes / count:8.1f} bytes/word ({store_bytes / 1024:.0f} KiB)")
+    print(f"Saved:                 {1 - store_bytes / dict_bytes:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
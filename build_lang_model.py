@@ -0,0 +1,53 @@
+# Builds lang_model.json for lang_id.py from the corpora in lang_data/
+#
+# Usage: python build_lang_model.py
+
+import json
+import math
+import os
+
+from lang_id import MODEL_PATH, extract_ngrams
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lang_data")
+LANGUAGES = ("de", "en")
+# Add-k smoothing for n-grams seen in one corpus but not the other
+SMOOTHING = 0.5
+# Rounding keeps the model file small without changing any decision
+PRECISION = 3
+
+
+def count_ngrams(path):
+    counts = {}
+    with open(path, encoding="utf-8") as corpus:
+        for line in corpus:
+            for gram in extract_ngrams(line):
+                counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def main():
+    counts = {lang: count_ngrams(os.path.join(DATA_DIR, f"{lang}.txt")) for lang in LANGUAGES}
+    vocabulary = set(counts["de"]) | set(counts["en"])
+    totals = {lang: sum(counts[lang].values()) + SMOOTHING * (len(vocabulary) + 1) for lang in LANGUAGES}
+
+    def log_prob(lang, gram):
+        return math.log((counts[lang].get(gram, 0) + SMOOTHING) / totals[lang])
+
+    log_odds = {
+        gram: round(log_prob("de", gram) - log_prob("en", gram), PRECISION)
+        for gram in sorted(vocabulary)
+    }
+    unseen_log_odds = round(math.log(totals["en"] / totals["de"]), PRECISION)
+
+    with open(MODEL_PATH, "w", encoding="utf-8") as model_file:
+        json.dump({
+            "orders": [1, 2, 3],
+            "log_odds": log_odds,
+            "unseen_log_odds": unseen_log_odds,
+            "prior_log_odds": 0.0,
+        }, model_file, ensure_ascii=False, separators=(",", ":"))
+    print(f"Wrote {len(log_odds)} n-grams to {MODEL_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,30 @@
 import streamlit as st
 from openai import OpenAI
-import speech_recognition as sr
 from gtts import gTTS
-import os
-import tempfile
-import base64
+import io
 import json
 from datetime import datetime, timedelta
 import pandas as pd
-import re
 import random
 import time
+import uuid
+import hashlib
+import functools
 from deep_translator import GoogleTranslator
 import plotly.express as px
 import plotly.graph_objects as go
+from vocab_tags import parse_vocab_tags
+from history_search import HistoryIndex, highlight_snippet
+from vocab_search import VocabularyIndex
+from vocab_store import VocabularyStore
+from rules_engine import RuleEngine
+from lang_id import LanguageIdentifier
+from voice_input import LocalWhisperRecognizer, OpenAIWhisperRecognizer, local_whisper_available, transcribe_recording
+from session_memory import DEFAULT_HOT_MESSAGES, MemoryGovernor, MessageLog, vocabulary_size
+from reply_cache import ReplyCache, is_cacheable_turn, prompt_key
+
+# Start of this full script run, for the rerun timing in measurement mode
+script_start_time = time.perf_counter()
 
 # Page configuration
 st.set_page_config(
@@ -69,16 +80,63 @@ def get_clients():
 
 client = get_clients()
 
+# Process-wide memory budget shared by all sessions
+@st.cache_resource
+def get_memory_governor():
+    return MemoryGovernor(
+        total_budget=int(st.secrets.get("MEMORY_BUDGET_MB", 512)) * 1024 * 1024,
+        session_budget=int(st.secrets.get("SESSION_MEMORY_BUDGET_MB", 8)) * 1024 * 1024
+    )
+
+memory_governor = get_memory_governor()
+
+# Replies shared between learners for short, low-context turns (opt-in in the sidebar)
+@st.cache_resource
+def get_reply_cache():
+    return ReplyCache(
+        ttl_seconds=int(st.secrets.get("REPLY_CACHE_TTL_MINUTES", 60)) * 60,
+        max_entries=int(st.secrets.get("REPLY_CACHE_MAX_ENTRIES", 2000)),
+        max_bytes=int(st.secrets.get("REPLY_CACHE_MAX_MB", 16)) * 1024 * 1024
+    )
+
+reply_cache = get_reply_cache()
+
+# Achievements and daily challenges - each one listens to a single stats counter
+ACHIEVEMENTS = [
+    {"name": "Chatterbox", "description": "Send 10 messages", "requirement": "10 messages", "counter": "messages_sent", "threshold": 10},
+    {"name": "Vocabulary Collector", "description": "Learn 50 words", "requirement": "50 words", "counter": "words_learned", "threshold": 50},
+    {"name": "Week Warrior", "description": "7-day streak", "requirement": "7 days", "counter": "daily_streak", "threshold": 7},
+    {"name": "Grammar Master", "description": "Complete 10 grammar exercises", "requirement": "10 exercises", "counter": "grammar_exercises_completed", "threshold": 10},
+    {"name": "Point Collector", "description": "Earn 500 points", "requirement": "500 points", "counter": "total_points", "threshold": 500},
+]
+
+DAILY_CHALLENGES = [
+    {"name": "Vocabulary Master", "description": "Learn 5 new words", "target": 5, "points": 50, "counter": "words_learned"},
+    {"name": "Conversation Starter", "description": "Send 10 messages", "target": 10, "points": 30, "counter": "messages_sent"},
+    {"name": "Grammar Guru", "description": "Complete 3 grammar exercises", "target": 3, "points": 40, "counter": "grammar_exercises_completed"},
+    {"name": "Translation Expert", "description": "Use translation 5 times", "target": 5, "points": 35, "counter": "translations_used"}
+]
+
+@st.cache_resource
+def get_rule_engine():
+    return RuleEngine(ACHIEVEMENTS, DAILY_CHALLENGES)
+
+rule_engine = get_rule_engine()
+
 # Gamification functions (MUST be defined before initialize_session_state)
 def generate_daily_challenges():
     challenges = [
-        {"name": "Vocabulary Master", "description": "Learn 5 new words", "target": 5, "progress": 0, "points": 50},
-        {"name": "Conversation Starter", "description": "Send 10 messages", "target": 10, "progress": 0, "points": 30},
-        {"name": "Grammar Guru", "description": "Complete 3 grammar exercises", "target": 3, "progress": 0, "points": 40},
-        {"name": "Translation Expert", "description": "Use translation 5 times", "target": 5, "progress": 0, "points": 35}
+        {"name": c["name"], "description": c["description"], "target": c["target"], "progress": 0, "points": c["points"]}
+        for c in DAILY_CHALLENGES
     ]
     return challenges
 
+def roll_over_daily_challenges():
+    today = datetime.now().strftime("%Y-%m-%d")
+    if st.session_state.get("challenges_date") != today:
+        st.session_state.daily_challenges = generate_daily_challenges()
+        st.session_state.challenges_date = today
+
 def update_daily_streak():
     today = datetime.now().strftime("%Y-%m-%d")
     last_activity = st.session_state.stats["last_activity"]
@@ -97,6 +155,29 @@ def add_achievement(achievement_name):
         st.success(f"🏆 Achievement Unlocked: {achievement_name}!")
         st.balloons()
 
+def counter_value(counter):
+    value = st.session_state.stats.get(counter, 0)
+    return len(value) if isinstance(value, list) else value
+
+# Counter changed by delta - only rules subscribed to this counter are evaluated.
+# delta=None re-checks the counter's achievements without advancing challenges.
+def emit_counter_event(counter, delta=None):
+    value = counter_value(counter)
+    if enable_daily_challenges and delta:
+        rule_engine.advance_challenges(st.session_state.daily_challenges, counter, delta)
+    if enable_achievements:
+        for achievement_name in rule_engine.newly_unlocked(counter, value, st.session_state.achievement_progress):
+            add_achievement(achievement_name)
+
+def recheck_achievements():
+    # Every counter at once, after an import or when achievements are switched back on
+    for counter in rule_engine.achievement_counters:
+        for achievement_name in rule_engine.resync(
+            counter, counter_value(counter), st.session_state.stats["achievements"],
+            st.session_state.achievement_progress
+        ):
+            add_achievement(achievement_name)
+
 def update_level():
     points = st.session_state.stats["total_points"]
     new_level = min(10, (points // 100) + 1)
@@ -106,8 +187,13 @@ def update_level():
 
 # Initialize session state with gamification
 def initialize_session_state():
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        # Only the most recent messages stay in memory, older ones spill to disk
+        st.session_state.messages = MessageLog()
+        memory_governor.register(st.session_state.session_id, st.session_state.messages)
     
     if "stats" not in st.session_state:
         st.session_state.stats = {
@@ -121,31 +207,88 @@ def initialize_session_state():
             "total_points": 0,
             "level": 1,
             "achievements": [],
+            "translations_used": 0,
             "last_activity": datetime.now().strftime("%Y-%m-%d")
         }
     
     if "vocabulary" not in st.session_state:
-        st.session_state.vocabulary = []
+        st.session_state.vocabulary = VocabularyStore()
     
     if "show_quiz" not in st.session_state:
         st.session_state.show_quiz = False
     
-    if "daily_challenges" not in st.session_state:
-        st.session_state.daily_challenges = generate_daily_challenges()
+    # Fresh set of daily challenges on the first run of each day
+    roll_over_daily_challenges()
     
     if "session_start_time" not in st.session_state:
         st.session_state.session_start_time = time.time()
     
+    if "achievement_progress" not in st.session_state:
+        # counter -> number of its thresholds already awarded
+        st.session_state.achievement_progress = {}
+    
     if "interface_language" not in st.session_state:
         st.session_state.interface_language = "English"
     
+    if "history_index" not in st.session_state:
+        st.session_state.history_index = HistoryIndex()
+    
+    if "vocab_index" not in st.session_state:
+        st.session_state.vocab_index = VocabularyIndex()
+    
     # Update daily streak
     update_daily_streak()
 
+# Conversation history search - only messages not yet indexed are added
+def sync_history_index():
+    index = st.session_state.history_index
+    messages = st.session_state.messages
+    if len(index) > len(messages):
+        index.clear()
+    for message_id in range(len(index), len(messages)):
+        index.add(message_id, messages[message_id]["content"])
+    return index
+
+# Vocabulary search - new words are appended, so only the tail needs indexing
+def sync_vocab_index():
+    index = st.session_state.vocab_index
+    vocabulary = st.session_state.vocabulary
+    if len(index) > len(vocabulary):
+        index.clear()
+    for entry_id in range(len(index), len(vocabulary)):
+        index.add(entry_id, vocabulary.german[entry_id], vocabulary.english[entry_id])
+    return index
+
+# Report this session's footprint; the governor spills old messages when over budget.
+# The search indexes cover every message, spilled or not, so they count as well.
+def update_memory_accounting():
+    other_bytes = (
+        vocabulary_size(st.session_state.vocabulary)
+        + st.session_state.history_index.memory_size()
+        + st.session_state.vocab_index.memory_size()
+    )
+    memory_governor.update(st.session_state.session_id, other_bytes)
+
 initialize_session_state()
+update_memory_accounting()
+
+# Offline language identification, loaded once per process
+# Below this confidence the text is too short or mixed to skip the remote call
+LANGUAGE_SKIP_CONFIDENCE = 0.5
+
+@st.cache_resource
+def get_language_identifier():
+    return LanguageIdentifier.load()
+
+def detect_language(text):
+    return get_language_identifier().identify(text)
 
 # Translation functions using deep-translator
 def translate_text(text, target_lang='en'):
+    # Already in the target language - no need to call the translator
+    language, confidence = detect_language(text)
+    if language == target_lang and confidence >= LANGUAGE_SKIP_CONFIDENCE:
+        return text
     try:
         if target_lang == 'en':
             result = GoogleTranslator(source='auto', target='en').translate(text)
@@ -155,6 +298,26 @@ def translate_text(text, target_lang='en'):
     except:
         return text
 
+# Translate button: German input goes to English, anything else to German.
+# Returns (target language, translation).
+def translate_either_way(text):
+    # Numbers and punctuation read the same in both languages
+    if not any(char.isalpha() for char in text):
+        return 'de', text
+    language, confidence = detect_language(text)
+    if confidence < LANGUAGE_SKIP_CONFIDENCE:
+        if any(char in text.lower() for char in "äöüß"):
+            language = 'de'
+        else:
+            # Too short to tell locally: one auto-detect call toward German. Text that
+            # comes back unchanged was German already and gets its English translation.
+            translation = translate_text(text, 'de')
+            if translation.strip().casefold() != text.strip().casefold():
+                return 'de', translation
+            language = 'de'
+    target_language = 'en' if language == 'de' else 'de'
+    return target_language, translate_text(text, target_language)
+
 def get_interface_text(key, lang="English"):
     translations = {
         "English": {
@@ -229,9 +392,16 @@ with st.sidebar:
     st.subheader("🎤 Audio Settings / Audio-Einstellungen")
     conversation_mode = st.radio(
         "Conversation Mode / Unterhaltungsmodus",
-        ["Text with Audio Response", "Text Only"],
+        ["Text with Audio Response", "Voice with Audio Response", "Text Only"],
         index=0
     )
+    speech_engine = "OpenAI Whisper (remote)"
+    if conversation_mode == "Voice with Audio Response":
+        # The offline engine is only offered when its optional packages are installed
+        speech_engines = ["OpenAI Whisper (remote)"]
+        if local_whisper_available():
+            speech_engines.append("Whisper (offline, local)")
+        speech_engine = st.selectbox("Speech recognition / Spracherkennung", speech_engines, index=0)
     auto_speak = st.checkbox("Auto-speak responses / Automatische Sprachausgabe", value=True)
     voice_speed = st.slider("Speech speed / Sprechgeschwindigkeit", 0.5, 2.0, 1.0, 0.1)
     
@@ -241,6 +411,16 @@ with st.sidebar:
     enable_daily_challenges = st.checkbox("Daily challenges / Tägliche Herausforderungen", value=True)
     show_progress_analytics = st.checkbox("Progress analytics / Fortschrittsanalyse", value=True)
     
+    # Shared replies
+    st.subheader("♻️ Reply Sharing")
+    share_replies = st.checkbox(
+        "Reuse replies to similar questions / Antworten wiederverwenden", value=False,
+        help="Short first questions that another learner already asked almost word for word are answered from a shared cache."
+    )
+    reply_similarity = 0.8
+    if share_replies:
+        reply_similarity = st.slider("Similarity threshold / Ähnlichkeitsschwelle", 0.8, 1.0, 0.8, 0.05)
+    
     # Progress display
     st.subheader(f"📊 {get_interface_text('progress', lang)}")
     
@@ -258,6 +438,67 @@ with st.sidebar:
     st.metric("Messages", st.session_state.stats["messages_sent"])
     st.metric("Words learned", len(st.session_state.stats["words_learned"]))
     st.metric("Corrections", st.session_state.stats["corrections_made"])
+    
+    # Developer settings
+    st.subheader("🧪 Developer")
+    use_fragments = st.checkbox(
+        "Partial reruns / Teilweise Neuausführung", value=True,
+        help="Search, filter and page widgets only re-execute their own region. Turn off to compare against full-script reruns."
+    )
+    measure_reruns = st.checkbox("Measure rerun time / Laufzeit messen", value=False)
+
+# Rerun timing - a fragment rerun skips the top of the script, so the flag tells
+# whether a region is running as part of a full run or on its own
+st.session_state.in_full_run = True
+
+def record_render_time(region, seconds, scope):
+    timings = st.session_state.setdefault("render_timings", [])
+    timings.append({
+        "time": datetime.now().strftime("%H:%M:%S"),
+        "region": region,
+        "scope": scope,
+        "ms": round(seconds * 1000, 1)
+    })
+    del timings[:-50]
+
+# Declares a timed UI region. Regions whose widgets only change what the region itself
+# shows can be fragments (st.fragment) that rerun without the rest of the app; anything
+# that changes shared state (messages, vocabulary, stats) has to stay a full rerun.
+def render_region(name, fragment=False):
+    def decorator(render):
+        @functools.wraps(render)
+        def timed_render():
+            start = time.perf_counter()
+            render()
+            if measure_reruns:
+                elapsed = time.perf_counter() - start
+                scope = "full run" if st.session_state.get("in_full_run") else "fragment"
+                record_render_time(name, elapsed, scope)
+                st.caption(f"⏱️ {name}: {elapsed * 1000:.0f} ms ({scope})")
+        return st.fragment(timed_render) if fragment and use_fragments else timed_render
+    return decorator
+
+# Plotly figures are rebuilt only when the underlying counts change
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_bar_chart(x, y, title, labels=None, color_scale=None):
+    if color_scale:
+        fig = px.bar(x=list(x), y=list(y), title=title, color=list(y), color_continuous_scale=color_scale)
+        fig.update_layout(showlegend=False)
+    else:
+        fig = px.bar(x=list(x), y=list(y), title=title, labels=labels)
+    return fig
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_pie_chart(values, names, title):
+    return px.pie(values=list(values), names=list(names), title=title)
+
+# Streak achievements are checked once the gamification settings are known;
+# switching achievements back on catches up on everything missed meanwhile
+if enable_achievements and not st.session_state.get("achievements_enabled", True):
+    recheck_achievements()
+else:
+    emit_counter_event("daily_streak")
+st.session_state.achievements_enabled = enable_achievements
 
 # Main header
 st.markdown(f"""
@@ -312,41 +553,33 @@ def get_enhanced_system_prompt(difficulty, selected_topic, input_language, show_
     """
 
 # Enhanced vocabulary extraction with gamification
-def extract_vocabulary_enhanced(text):
-    vocab_pattern = r'\[VOCAB: ([^-]+) - ([^\]]+)\]'
-    matches = re.findall(vocab_pattern, text)
+def record_vocabulary(vocab_pairs):
+    vocabulary = st.session_state.vocabulary
     new_words_learned = 0
     
-    for german, english in matches:
-        vocab_entry = {
-            "german": german.strip(),
-            "english": english.strip(),
-            "date_learned": datetime.now().strftime("%Y-%m-%d"),
-            "difficulty": difficulty,
-            "topic": selected_topic,
-            "times_seen": 1,
-            "mastery_level": "Learning"
-        }
-        
-        existing_word = next((v for v in st.session_state.vocabulary if v["german"] == vocab_entry["german"]), None)
-        if existing_word:
-            existing_word["times_seen"] += 1
-            if existing_word["times_seen"] >= 3:
-                existing_word["mastery_level"] = "Mastered"
+    for german, english in vocab_pairs:
+        existing_row = vocabulary.find(german)
+        if existing_row is not None:
+            vocabulary.mark_seen(existing_row)
         else:
-            st.session_state.vocabulary.append(vocab_entry)
-            if vocab_entry["german"] not in st.session_state.stats["words_learned"]:
-                st.session_state.stats["words_learned"].append(vocab_entry["german"])
+            vocabulary.append(german, english, datetime.now().date(), difficulty, selected_topic)
+            if german not in st.session_state.stats["words_learned"]:
+                st.session_state.stats["words_learned"].append(german)
                 new_words_learned += 1
                 st.session_state.stats["total_points"] += 10
     
-    # Update daily challenges
-    if new_words_learned > 0 and enable_daily_challenges:
-        st.session_state.daily_challenges[0]["progress"] += new_words_learned
-    
-    return re.sub(vocab_pattern, r'\1', text)
+    if new_words_learned > 0:
+        emit_counter_event("words_learned", new_words_learned)
+        emit_counter_event("total_points", 10 * new_words_learned)
+
+def extract_vocabulary_enhanced(text):
+    clean_text, vocab_pairs = parse_vocab_tags(text)
+    record_vocabulary(vocab_pairs)
+    return clean_text
 
 # Enhanced chat function with OpenAI Whisper integration
+CHAT_ERROR_REPLY = "Entschuldigung, es gab einen Fehler. Bitte versuchen Sie es erneut."
+
 @st.cache_data
 def chat_with_gpt_enhanced(user_input, messages_context, system_prompt):
     try:
@@ -362,13 +595,46 @@ def chat_with_gpt_enhanced(user_input, messages_context, system_prompt):
         return response.choices[0].message.content
     except Exception as e:
         st.error(f"Error communicating with OpenAI: {str(e)}")
-        return "Entschuldigung, es gab einen Fehler. Bitte versuchen Sie es erneut."
+        return CHAT_ERROR_REPLY
 
-# Simplified voice input - Text input with audio output only
-def simplified_voice_input():
-    st.markdown("### 💬 Text Input with Audio Response")
-    st.info("🎤 Voice recording disabled - Using text input with audio feedback")
-    return None
+# Voice input - silence is dropped by VAD, speech segments go to the selected recognizer
+@st.cache_resource
+def get_speech_recognizer(engine):
+    if engine == "Whisper (offline, local)":
+        return LocalWhisperRecognizer()
+    return OpenAIWhisperRecognizer(client)
+
+def voice_input_panel():
+    st.markdown("### 🎤 Voice Input")
+    recording = st.audio_input("Record your message / Nimm deine Nachricht auf", key="voice_recording")
+    if recording is None:
+        return None
+    
+    # The widget keeps returning the same recording on every rerun, only transcribe it once
+    audio_bytes = recording.getvalue()
+    recording_id = hashlib.sha1(audio_bytes).hexdigest()
+    if st.session_state.get("last_voice_recording") == recording_id:
+        return None
+    st.session_state.last_voice_recording = recording_id
+    
+    try:
+        with st.spinner("🎧 Listening..."):
+            transcripts, metrics = transcribe_recording(audio_bytes, get_speech_recognizer(speech_engine))
+    except Exception as e:
+        st.error(f"Speech recognition error: {str(e)}")
+        return None
+    
+    st.caption(
+        f"🎙️ {metrics['audio_seconds']:.1f}s audio, {metrics['silence_skipped_seconds']:.1f}s silence skipped, "
+        f"processed in {metrics['processing_seconds']:.2f}s ({metrics['real_time_factor']:.2f}× real-time)"
+    )
+    transcript = " ".join(transcripts).strip()
+    if not transcript:
+        st.warning("No speech detected. Please try again.")
+        return None
+    
+    st.info(f"🗣️ **You said:** {transcript}")
+    return transcript
 
 # Enhanced conversation processing with gamification
 def process_enhanced_conversation(user_input):
@@ -377,83 +643,106 @@ def process_enhanced_conversation(user_input):
         show_translation, grammar_correction_mode
     )
     
-    reply = chat_with_gpt_enhanced(user_input, st.session_state.messages, system_prompt)
+    # Context is the in-memory tail, so a reply never has to page history in from disk
+    messages_context = st.session_state.messages[-DEFAULT_HOT_MESSAGES:]
+    
+    # Short, low-context turns may reuse a reply another learner got for nearly the same input
+    cacheable = share_replies and is_cacheable_turn(user_input, messages_context)
+    reply = None
+    if cacheable:
+        cache_key = prompt_key(system_prompt, messages_context)
+        reply = reply_cache.get(cache_key, user_input, reply_similarity)
+    if reply is None:
+        start = time.perf_counter()
+        reply = chat_with_gpt_enhanced(user_input, messages_context, system_prompt)
+        if cacheable and reply != CHAT_ERROR_REPLY:
+            reply_cache.put(cache_key, user_input, reply, time.perf_counter() - start)
     
     # Update conversation history
     st.session_state.messages.append({"role": "user", "content": user_input})
     st.session_state.messages.append({"role": "assistant", "content": reply})
+    sync_history_index()
+    update_memory_accounting()
     
     # Enhanced statistics tracking with gamification
     st.session_state.stats["messages_sent"] += 1
-    st.session_state.stats["total_points"] += 5
-    
-    # Update daily challenges
-    if enable_daily_challenges:
-        st.session_state.daily_challenges[1]["progress"] += 1
+    emit_counter_event("messages_sent", 1)
+    points_earned = 5
     
     # Grammar correction tracking
     if any(word in reply.lower() for word in ["korrektur", "fehler", "richtig", "falsch"]):
         st.session_state.stats["corrections_made"] += 1
-        st.session_state.stats["total_points"] += 15
+        points_earned += 15
     
     # Grammar exercise tracking
     if "übung" in reply.lower() or "exercise" in reply.lower():
         st.session_state.stats["grammar_exercises_completed"] += 1
-        st.session_state.stats["total_points"] += 20
-        if enable_daily_challenges:
-            st.session_state.daily_challenges[2]["progress"] += 1
+        emit_counter_event("grammar_exercises_completed", 1)
+        points_earned += 20
     
-    # Check for achievements
-    if enable_achievements:
-        check_achievements()
+    st.session_state.stats["total_points"] += points_earned
+    emit_counter_event("total_points", points_earned)
     
     # Update level
     update_level()
     
     return reply
 
-def check_achievements():
-    stats = st.session_state.stats
-    
-    if stats["messages_sent"] >= 10:
-        add_achievement("Chatterbox")
-    if len(stats["words_learned"]) >= 50:
-        add_achievement("Vocabulary Collector")
-    if stats["daily_streak"] >= 7:
-        add_achievement("Week Warrior")
-    if stats["grammar_exercises_completed"] >= 10:
-        add_achievement("Grammar Master")
-    if stats["total_points"] >= 500:
-        add_achievement("Point Collector")
-
 # Enhanced text-to-speech
+# Synthesized MP3s are cached by text/lang/speed, so repeat plays skip gTTS entirely.
+# st.audio hands the bytes to Streamlit's media endpoint, which serves them under a
+# content-hash URL instead of pushing a base64 payload through every rerender.
+@st.cache_data(max_entries=256, show_spinner=False)
+def synthesize_speech(clean_text, lang='de', slow=False):
+    tts = gTTS(clean_text, lang=lang, slow=slow)
+    audio_buffer = io.BytesIO()
+    tts.write_to_fp(audio_buffer)
+    return audio_buffer.getvalue()
+
 def enhanced_speak_text(text, speed=1.0, lang='de'):
     try:
-        clean_text = extract_vocabulary_enhanced(text)
-        clean_text = re.sub(r'\*\*|__|~~|\[|\]|\(|\)', '', clean_text)
-        
-        tts = gTTS(clean_text, lang=lang, slow=(speed < 1.0))
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tts.save(tmp.name)
-            with open(tmp.name, 'rb') as audio_file:
-                audio_bytes = audio_file.read()
-            os.unlink(tmp.name)
-        
-        audio_base64 = base64.b64encode(audio_bytes).decode()
-        audio_html = f"""
-        <audio controls autoplay style="width: 100%;">
-            <source src="data:audio/mp3;base64,{audio_base64}" type="audio/mp3">
-            Your browser does not support the audio element.
-        </audio>
-        """
-        st.markdown(audio_html, unsafe_allow_html=True)
+        # Display/speech clean-up only, vocabulary is recorded when the reply arrives
+        clean_text, _ = parse_vocab_tags(text, speech=True)
+        
+        audio_bytes = synthesize_speech(clean_text.strip(), lang, speed < 1.0)
+        st.audio(audio_bytes, format="audio/mp3", autoplay=True)
     except Exception as e:
         st.error(f"Text-to-speech error: {str(e)}")
 
-# Main interface with tabs
+# Main interface with tabs - sending, quizzes and tools change state shown in every
+# tab, so tabs rerun with the whole script; only read-only regions are fragments
 tab1, tab2, tab3, tab4 = st.tabs(["💬 Conversation", "📚 Vocabulary", "🏆 Achievements", "📊 Analytics"])
 
-with tab1:
+# Search widgets only change what this region shows, so they rerun on their own
+@render_region("History Search", fragment=True)
+def render_history_search():
+    st.markdown("### 🔍 Search Conversation History")
+    search_col1, search_col2 = st.columns([3, 1])
+    with search_col1:
+        history_query = st.text_input(
+            "Search words or \"exact phrases\" / Suche nach Wörtern oder \"Phrasen\"",
+            key="history_query"
+        )
+    with search_col2:
+        history_page = st.number_input("Page", min_value=1, value=1, step=1, key="history_page")
+    
+    if history_query.strip():
+        index = sync_history_index()
+        page_size = 10
+        total_hits, results = index.search(history_query, page=history_page, page_size=page_size)
+        if total_hits:
+            total_pages = (total_hits + page_size - 1) // page_size
+            st.caption(f"{total_hits} matching messages - page {min(history_page, total_pages)} of {total_pages}")
+            for message_id, score in results:
+                msg = st.session_state.messages[message_id]
+                role = "🧑 You" if msg["role"] == "user" else "🤖 GPT"
+                content = parse_vocab_tags(msg["content"])[0] if msg["role"] == "assistant" else msg["content"]
+                st.markdown(f"**{role}** (#{message_id + 1}): {highlight_snippet(content, history_query)}")
+        else:
+            st.info("No messages found.")
+
+@render_region("Conversation")
+def render_conversation_tab():
     # Conversation interface
     col1, col2 = st.columns([3, 1])
     
@@ -485,30 +774,34 @@ with tab1:
             clear_btn = st.button("🗑️ Clear", use_container_width=True)
         
         # Handle interactions
-        if submit_btn and user_input.strip():
+        message_text = user_input.strip() if submit_btn else ""
+        if conversation_mode == "Voice with Audio Response":
+            message_text = voice_input_panel() or message_text
+        
+        if message_text:
             with st.spinner("🤖 GPT is thinking..."):
-                reply = process_enhanced_conversation(user_input.strip())
+                reply = process_enhanced_conversation(message_text)
                 clean_reply = extract_vocabulary_enhanced(reply)
                 
                 st.success(f"**GPT:** {clean_reply}")
                 
-                if conversation_mode == "Text with Audio Response" and auto_speak:
+                if conversation_mode != "Text Only" and auto_speak:
                     enhanced_speak_text(reply, voice_speed)
         
         if translate_btn and user_input.strip():
-            if any(char in user_input for char in "äöüß"):
-                translation = translate_text(user_input, 'en')
+            target_language, translation = translate_either_way(user_input)
+            if target_language == 'en':
                 st.info(f"🇺🇸 **English:** {translation}")
             else:
-                translation = translate_text(user_input, 'de')
                 st.info(f"🇩🇪 **Deutsch:** {translation}")
             
             # Update translation challenge
-            if enable_daily_challenges:
-                st.session_state.daily_challenges[3]["progress"] += 1
+            st.session_state.stats["translations_used"] = st.session_state.stats.get("translations_used", 0) + 1
+            emit_counter_event("translations_used", 1)
         
         if clear_btn:
-            st.session_state.messages = []
+            st.session_state.messages.clear()
+            st.session_state.history_index.clear()
             st.cache_data.clear()
             st.rerun()
     
@@ -541,17 +834,17 @@ with tab1:
             ]
             exercise = random.choice(grammar_exercises)
             reply = process_enhanced_conversation(f"Grammatikübung: {exercise}")
-            st.info(reply)
+            st.info(extract_vocabulary_enhanced(reply))
         
         if st.button("🎲 Random Topic", use_container_width=True):
             topics = ["Wetter", "Familie", "Hobbys", "Reisen", "Essen", "Musik", "Sport"]
             topic = random.choice(topics)
             reply = process_enhanced_conversation(f"Lass uns über {topic} sprechen.")
-            st.info(reply)
+            st.info(extract_vocabulary_enhanced(reply))
         
         if st.button("📚 Vocabulary Quiz", use_container_width=True):
             if len(st.session_state.vocabulary) >= 3:
-                quiz_word = random.choice(st.session_state.vocabulary)
+                quiz_word = random.choice(st.session_state.vocabulary).to_dict()
                 st.session_state.quiz_word = quiz_word
                 st.session_state.show_quiz = True
                 st.rerun()
@@ -561,7 +854,7 @@ with tab1:
         st.markdown("### 💬 Recent Conversation")
         for i, msg in enumerate(st.session_state.messages[-6:]):  # Show last 6 messages
             role = "🧑 You" if msg["role"] == "user" else "🤖 GPT"
-            content = extract_vocabulary_enhanced(msg["content"]) if msg["role"] == "assistant" else msg["content"]
+            content = parse_vocab_tags(msg["content"])[0] if msg["role"] == "assistant" else msg["content"]
             
             with st.expander(f"{role}: {content[:50]}..."):
                 st.markdown(content)
@@ -574,134 +867,185 @@ with tab1:
                         if st.button(f"🔄 Translate", key=f"translate_{i}"):
                             translation = translate_text(content, 'en')
                             st.info(f"**English:** {translation}")
+    
+    # Search the full conversation history
+    if st.session_state.messages:
+        render_history_search()
 
-with tab2:
-    # Enhanced vocabulary section
-    st.markdown("### 📚 Enhanced Vocabulary Manager")
+with tab1:
+    render_conversation_tab()
+
+# Search, filters and paging only change the word list below them
+@render_region("Vocabulary List", fragment=True)
+def render_vocabulary_list():
+    # Fuzzy search
+    vocab_query = st.text_input(
+        "🔍 Search vocabulary (German or English, typos and ue/ss spellings are fine)",
+        key="vocab_query"
+    )
     
-    if st.session_state.vocabulary:
-        # Vocabulary statistics
-        vocab_df = pd.DataFrame(st.session_state.vocabulary)
+    # Filters
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        difficulty_filter = st.selectbox("Filter by difficulty", ["All"] + ["Beginner", "Intermediate", "Advanced"])
+    with col2:
+        topic_filter = st.selectbox("Filter by topic", ["All"] + topics)
+    with col3:
+        mastery_filter = st.selectbox("Filter by mastery", ["All", "Learning", "Mastered"])
+    
+    # Apply search and filters
+    if vocab_query.strip():
+        index = sync_vocab_index()
+        _, matching_ids = index.search(vocab_query, page_size=len(index))
+        filtered_vocab = [st.session_state.vocabulary[entry_id] for entry_id in matching_ids]
+    else:
+        filtered_vocab = st.session_state.vocabulary
+    if difficulty_filter != "All":
+        filtered_vocab = [v for v in filtered_vocab if v.get("difficulty") == difficulty_filter]
+    if topic_filter != "All":
+        filtered_vocab = [v for v in filtered_vocab if v.get("topic") == topic_filter]
+    if mastery_filter != "All":
+        filtered_vocab = [v for v in filtered_vocab if v.get("mastery_level") == mastery_filter]
+    
+    if filtered_vocab:
+        # Display vocabulary cards, one page at a time
+        cards_per_page = 10
+        total_pages = (len(filtered_vocab) + cards_per_page - 1) // cards_per_page
+        vocab_page = 1
+        if total_pages > 1:
+            vocab_page = st.number_input(f"Page (of {total_pages})", min_value=1, value=1, step=1, key="vocab_page")
+            vocab_page = min(vocab_page, total_pages)
+        st.caption(f"{len(filtered_vocab)} words")
+        page_start = (vocab_page - 1) * cards_per_page
+        for vocab in filtered_vocab[page_start:page_start + cards_per_page]:
+            mastery_color = "🟢" if vocab.get("mastery_level") == "Mastered" else "🟡"
+            st.markdown(f"""
+            <div class='vocabulary-card'>
+                <strong>{mastery_color} {vocab['german']}</strong> - {vocab['english']}<br>
+                <small>Topic: {vocab.get('topic', 'N/A')} | Seen: {vocab.get('times_seen', 1)} times | Date: {vocab['date_learned']}</small>
+            </div>
+            """, unsafe_allow_html=True)
         
-        # Filters
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            difficulty_filter = st.selectbox("Filter by difficulty", ["All"] + ["Beginner", "Intermediate", "Advanced"])
-        with col2:
-            topic_filter = st.selectbox("Filter by topic", ["All"] + topics)
-        with col3:
-            mastery_filter = st.selectbox("Filter by mastery", ["All", "Learning", "Mastered"])
+        # Vocabulary analytics
+        if show_progress_analytics:
+            st.markdown("### 📊 Vocabulary Analytics")
+            
+            # Vocabulary growth chart
+            date_counts = st.session_state.vocabulary.counts("date_learned")
+            
+            if date_counts:
+                fig = build_bar_chart(
+                    tuple(date_counts.keys()), 
+                    tuple(date_counts.values()),
+                    "Vocabulary Learning Progress",
+                    labels={"x": "Date", "y": "Words Learned"}
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            
+            # Mastery level pie chart
+            mastery_counts = st.session_state.vocabulary.counts("mastery_level", "Learning")
+            
+            if mastery_counts:
+                fig = build_pie_chart(
+                    tuple(mastery_counts.values()),
+                    tuple(mastery_counts.keys()),
+                    "Vocabulary Mastery Distribution"
+                )
+                st.plotly_chart(fig, use_container_width=True)
+
+# Picking an answer or playing audio only touches the quiz. A checked answer changes
+# points and achievements shown elsewhere, so it reruns the whole app; its result is
+# kept in session state so it survives that rerun.
+def award_quiz_points(correct, points, message):
+    st.session_state.stats["total_points"] += points
+    emit_counter_event("total_points", points)
+    st.session_state.quiz_feedback = (correct, message)
+    st.rerun(scope="app")
+
+@render_region("Vocabulary Quiz", fragment=True)
+def render_vocabulary_quiz():
+    st.markdown("### 🎯 Enhanced Vocabulary Quiz")
+    quiz_word = st.session_state.quiz_word
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown(f"**What does '{quiz_word['german']}' mean in English?**")
         
-        # Apply filters
-        filtered_vocab = st.session_state.vocabulary
-        if difficulty_filter != "All":
-            filtered_vocab = [v for v in filtered_vocab if v.get("difficulty") == difficulty_filter]
-        if topic_filter != "All":
-            filtered_vocab = [v for v in filtered_vocab if v.get("topic") == topic_filter]
-        if mastery_filter != "All":
-            filtered_vocab = [v for v in filtered_vocab if v.get("mastery_level") == mastery_filter]
-        
-        if filtered_vocab:
-            # Display vocabulary cards
-            for vocab in filtered_vocab[:10]:
-                mastery_color = "🟢" if vocab.get("mastery_level") == "Mastered" else "🟡"
-                st.markdown(f"""
-                <div class='vocabulary-card'>
-                    <strong>{mastery_color} {vocab['german']}</strong> - {vocab['english']}<br>
-                    <small>Topic: {vocab.get('topic', 'N/A')} | Seen: {vocab.get('times_seen', 1)} times | Date: {vocab['date_learned']}</small>
-                </div>
-                """, unsafe_allow_html=True)
+        # Multiple choice quiz - choices are drawn once per word, not on every rerun
+        correct_answer = quiz_word['english']
+        if st.session_state.get("quiz_choices_word") != quiz_word['german']:
+            wrong_answers = [english for english in st.session_state.vocabulary.english if english != correct_answer]
+            choices = None
+            if len(wrong_answers) >= 3:
+                choices = [correct_answer] + random.sample(wrong_answers, 3)
+                random.shuffle(choices)
+            st.session_state.quiz_choices = choices
+            st.session_state.quiz_choices_word = quiz_word['german']
+        choices = st.session_state.quiz_choices
+        
+        if choices:
+            user_choice = st.radio("Choose the correct answer:", choices, key="quiz_choice")
             
-            # Vocabulary analytics
-            if show_progress_analytics:
-                st.markdown("### 📊 Vocabulary Analytics")
-                
-                # Vocabulary growth chart
-                dates = [v['date_learned'] for v in st.session_state.vocabulary]
-                date_counts = {}
-                for date in dates:
-                    date_counts[date] = date_counts.get(date, 0) + 1
-                
-                if date_counts:
-                    fig = px.bar(
-                        x=list(date_counts.keys()), 
-                        y=list(date_counts.values()),
-                        title="Vocabulary Learning Progress",
-                        labels={"x": "Date", "y": "Words Learned"}
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # Mastery level pie chart
-                mastery_counts = {}
-                for vocab in st.session_state.vocabulary:
-                    mastery = vocab.get("mastery_level", "Learning")
-                    mastery_counts[mastery] = mastery_counts.get(mastery, 0) + 1
-                
-                if mastery_counts:
-                    fig = px.pie(
-                        values=list(mastery_counts.values()),
-                        names=list(mastery_counts.keys()),
-                        title="Vocabulary Mastery Distribution"
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+            if st.button("Check Answer"):
+                if user_choice == correct_answer:
+                    award_quiz_points(True, 25, "🎉 Correct! Well done!")
+                else:
+                    award_quiz_points(False, 5, f"❌ Not quite. The correct answer is: **{correct_answer}**")  # Consolation points
+        else:
+            # Fallback to text input
+            user_answer = st.text_input("Your answer:", key="quiz_answer")
+            if st.button("Check Answer"):
+                if user_answer.lower().strip() == correct_answer.lower().strip():
+                    award_quiz_points(True, 25, "🎉 Correct! Well done!")
+                else:
+                    st.error(f"❌ Not quite. The correct answer is: **{correct_answer}**")
+        
+        # Result of the answer checked in the previous run
+        feedback = st.session_state.pop("quiz_feedback", None)
+        if feedback:
+            correct, message = feedback
+            if correct:
+                st.success(message)
+                st.balloons()
+            else:
+                st.error(message)
+    
+    with col2:
+        if st.button("🔊 Pronounce German"):
+            enhanced_speak_text(quiz_word['german'], voice_speed)
+        
+        if st.button("🔊 Pronounce English"):
+            enhanced_speak_text(quiz_word['english'], voice_speed, 'en')
+        
+        st.markdown(f"**Topic:** {quiz_word.get('topic', 'N/A')}")
+        st.markdown(f"**Difficulty:** {quiz_word.get('difficulty', 'N/A')}")
+        
+        if st.button("End Quiz"):
+            st.session_state.show_quiz = False
+            if 'quiz_word' in st.session_state:
+                del st.session_state.quiz_word
+            st.rerun(scope="app")
+
+@render_region("Vocabulary")
+def render_vocabulary_tab():
+    # Enhanced vocabulary section
+    st.markdown("### 📚 Enhanced Vocabulary Manager")
+    
+    if st.session_state.vocabulary:
+        render_vocabulary_list()
         
         # Enhanced quiz section
         if st.session_state.show_quiz and hasattr(st.session_state, 'quiz_word'):
-            st.markdown("### 🎯 Enhanced Vocabulary Quiz")
-            quiz_word = st.session_state.quiz_word
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown(f"**What does '{quiz_word['german']}' mean in English?**")
-                
-                # Multiple choice quiz
-                correct_answer = quiz_word['english']
-                wrong_answers = [v['english'] for v in st.session_state.vocabulary if v['english'] != correct_answer]
-                if len(wrong_answers) >= 3:
-                    choices = [correct_answer] + random.sample(wrong_answers, 3)
-                    random.shuffle(choices)
-                    
-                    user_choice = st.radio("Choose the correct answer:", choices, key="quiz_choice")
-                    
-                    if st.button("Check Answer"):
-                        if user_choice == correct_answer:
-                            st.success("🎉 Correct! Well done!")
-                            st.session_state.stats["total_points"] += 25
-                            st.balloons()
-                        else:
-                            st.error(f"❌ Not quite. The correct answer is: **{correct_answer}**")
-                            st.session_state.stats["total_points"] += 5  # Consolation points
-                else:
-                    # Fallback to text input
-                    user_answer = st.text_input("Your answer:", key="quiz_answer")
-                    if st.button("Check Answer"):
-                        if user_answer.lower().strip() == correct_answer.lower().strip():
-                            st.success("🎉 Correct! Well done!")
-                            st.session_state.stats["total_points"] += 25
-                            st.balloons()
-                        else:
-                            st.error(f"❌ Not quite. The correct answer is: **{correct_answer}**")
-            
-            with col2:
-                if st.button("🔊 Pronounce German"):
-                    enhanced_speak_text(quiz_word['german'], voice_speed)
-                
-                if st.button("🔊 Pronounce English"):
-                    enhanced_speak_text(quiz_word['english'], voice_speed, 'en')
-                
-                st.markdown(f"**Topic:** {quiz_word.get('topic', 'N/A')}")
-                st.markdown(f"**Difficulty:** {quiz_word.get('difficulty', 'N/A')}")
-                
-                if st.button("End Quiz"):
-                    st.session_state.show_quiz = False
-                    if 'quiz_word' in st.session_state:
-                        del st.session_state.quiz_word
-                    st.rerun()
+            render_vocabulary_quiz()
     
     else:
         st.info("Start conversations to build your vocabulary! 📚")
 
-with tab3:
+with tab2:
+    render_vocabulary_tab()
+
+@render_region("Achievements")
+def render_achievements_tab():
     # Achievements and gamification
     st.markdown("### 🏆 Achievements & Rewards")
     
@@ -732,15 +1076,7 @@ with tab3:
     
     # Available achievements
     st.markdown("### 🔒 Available Achievements")
-    available_achievements = [
-        {"name": "Chatterbox", "description": "Send 10 messages", "requirement": "10 messages"},
-        {"name": "Vocabulary Collector", "description": "Learn 50 words", "requirement": "50 words"},
-        {"name": "Week Warrior", "description": "7-day streak", "requirement": "7 days"},
-        {"name": "Grammar Master", "description": "Complete 10 grammar exercises", "requirement": "10 exercises"},
-        {"name": "Point Collector", "description": "Earn 500 points", "requirement": "500 points"},
-    ]
-    
-    for achievement in available_achievements:
+    for achievement in ACHIEVEMENTS:
         if achievement["name"] not in st.session_state.stats["achievements"]:
             st.markdown(f"🔒 **{achievement['name']}** - {achievement['description']} (*{achievement['requirement']}*)")
     
@@ -761,7 +1097,11 @@ with tab3:
             st.progress(completion)
             st.markdown(f"*{challenge['description']} ({progress}/{challenge['target']}) - {challenge['points']} points*")
 
-with tab4:
+with tab3:
+    render_achievements_tab()
+
+@render_region("Analytics")
+def render_analytics_tab():
     # Analytics dashboard
     st.markdown("### 📊 Learning Analytics Dashboard")
     
@@ -780,7 +1120,7 @@ with tab4:
             st.metric(
                 "Vocabulary Size", 
                 len(st.session_state.vocabulary),
-                delta=len([v for v in st.session_state.vocabulary if v['date_learned'] == datetime.now().strftime("%Y-%m-%d")])
+                delta=st.session_state.vocabulary.counts("date_learned").get(datetime.now().strftime("%Y-%m-%d"), 0)
             )
         
         with col3:
@@ -830,20 +1170,15 @@ with tab4:
         
         # Topic distribution
         if st.session_state.vocabulary:
-            topic_counts = {}
-            for vocab in st.session_state.vocabulary:
-                topic = vocab.get('topic', 'Unknown')
-                topic_counts[topic] = topic_counts.get(topic, 0) + 1
+            topic_counts = st.session_state.vocabulary.counts("topic", "Unknown")
             
             if topic_counts:
-                fig = px.bar(
-                    x=list(topic_counts.keys()),
-                    y=list(topic_counts.values()),
-                    title="Vocabulary by Topic",
-                    color=list(topic_counts.values()),
-                    color_continuous_scale="Viridis"
+                fig = build_bar_chart(
+                    tuple(topic_counts.keys()),
+                    tuple(topic_counts.values()),
+                    "Vocabulary by Topic",
+                    color_scale="Viridis"
                 )
-                fig.update_layout(showlegend=False)
                 st.plotly_chart(fig, use_container_width=True)
         
         # Learning insights
@@ -867,10 +1202,7 @@ with tab4:
         
         most_common_topic = None
         if st.session_state.vocabulary:
-            topic_counts = {}
-            for vocab in st.session_state.vocabulary:
-                topic = vocab.get('topic', 'Unknown')
-                topic_counts[topic] = topic_counts.get(topic, 0) + 1
+            topic_counts = st.session_state.vocabulary.counts("topic", "Unknown")
             if topic_counts:
                 most_common_topic = max(topic_counts, key=topic_counts.get)
                 insights.append(f"🎯 Your favorite topic: {most_common_topic}")
@@ -880,57 +1212,112 @@ with tab4:
     
     else:
         st.info("Start learning to see your analytics! 📊")
+    
+    # Memory footprint of this session and the whole server process
+    with st.expander("🧠 Memory Usage"):
+        session_memory = memory_governor.session_metrics(st.session_state.session_id)
+        process_memory = memory_governor.metrics()
+        
+        mem_col1, mem_col2, mem_col3 = st.columns(3)
+        with mem_col1:
+            st.metric("This session", f"{session_memory['total_bytes'] / 1024:.0f} KiB")
+            st.caption(f"Messages in memory: {session_memory['messages_in_memory']} | on disk: {session_memory['messages_on_disk']}")
+            st.caption(f"Vocabulary and search indexes: {session_memory['other_bytes'] / 1024:.0f} KiB")
+        with mem_col2:
+            st.metric("All sessions", f"{process_memory['total_bytes'] / (1024 * 1024):.1f} MiB")
+            st.caption(f"Budget: {process_memory['total_budget'] / (1024 * 1024):.0f} MiB")
+        with mem_col3:
+            st.metric("Active sessions", process_memory["sessions"])
+            st.caption(f"Spilled to disk: {process_memory['bytes_spilled'] / 1024:.0f} KiB")
+    
+    # Shared reply cache across all sessions of this process
+    with st.expander("♻️ Reply Cache"):
+        cache_metrics = reply_cache.metrics()
+        
+        cache_col1, cache_col2, cache_col3 = st.columns(3)
+        with cache_col1:
+            st.metric("Hit rate", f"{cache_metrics['hit_rate']:.0%}")
+            st.caption(f"Hits: {cache_metrics['hits']} of {cache_metrics['lookups']} lookups")
+        with cache_col2:
+            st.metric("Time saved", f"{cache_metrics['latency_saved_seconds']:.1f} s")
+            st.caption(f"Lookup: {cache_metrics['mean_lookup_ms']:.2f} ms on average")
+        with cache_col3:
+            st.metric("Cached replies", cache_metrics["entries"])
+            st.caption(
+                f"{cache_metrics['bytes'] / 1024:.0f} KiB of {cache_metrics['max_bytes'] / (1024 * 1024):.0f} MiB | "
+                f"evicted: {cache_metrics['evictions']} | expired: {cache_metrics['expirations']}"
+            )
+
+with tab4:
+    render_analytics_tab()
 
 # Data export and import
-st.markdown("### 💾 Data Management")
-
-col1, col2 = st.columns(2)
-
-with col1:
-    if st.button("📥 Export All Data", use_container_width=True):
-        export_data = {
-            "messages": st.session_state.messages,
-            "vocabulary": st.session_state.vocabulary,
-            "stats": st.session_state.stats,
-            "daily_challenges": st.session_state.daily_challenges,
-            "settings": {
-                "difficulty": difficulty,
-                "topic": selected_topic,
-                "input_language": input_language,
-                "interface_language": st.session_state.interface_language
-            },
-            "export_date": datetime.now().isoformat(),
-            "version": "2.0"
-        }
+@render_region("Data Management", fragment=True)
+def render_data_management():
+    st.markdown("### 💾 Data Management")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        if st.button("📥 Export All Data", use_container_width=True):
+            export_data = {
+                "messages": st.session_state.messages.to_list(),
+                "vocabulary": st.session_state.vocabulary.to_records(),
+                "stats": st.session_state.stats,
+                "daily_challenges": st.session_state.daily_challenges,
+                "settings": {
+                    "difficulty": difficulty,
+                    "topic": selected_topic,
+                    "input_language": input_language,
+                    "interface_language": st.session_state.interface_language
+                },
+                "export_date": datetime.now().isoformat(),
+                "version": "2.0"
+            }
         
-        json_data = json.dumps(export_data, indent=2, ensure_ascii=False)
-        st.download_button(
-            label="📥 Download Complete Data",
-            data=json_data,
-            file_name=f"german_learning_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            mime="application/json",
-            use_container_width=True
-        )
+            json_data = json.dumps(export_data, indent=2, ensure_ascii=False)
+            st.download_button(
+                label="📥 Download Complete Data",
+                data=json_data,
+                file_name=f"german_learning_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True
+            )
 
-with col2:
-    uploaded_file = st.file_uploader("📤 Import Learning Data", type=['json'])
-    if uploaded_file is not None:
-        try:
-            import_data = json.load(uploaded_file)
+    with col2:
+        uploaded_file = st.file_uploader("📤 Import Learning Data", type=['json'])
+        if uploaded_file is not None:
+            try:
+                import_data = json.load(uploaded_file)
             
-            # Import data with validation
-            if "messages" in import_data:
-                st.session_state.messages = import_data["messages"]
-            if "vocabulary" in import_data:
-                st.session_state.vocabulary = import_data["vocabulary"]
-            if "stats" in import_data:
-                st.session_state.stats.update(import_data["stats"])
-            if "daily_challenges" in import_data:
-                st.session_state.daily_challenges = import_data["daily_challenges"]
+                # Import data with validation
+                if "messages" in import_data:
+                    st.session_state.messages.replace(import_data["messages"])
+                    st.session_state.history_index.clear()
+                    sync_history_index()
+                if "vocabulary" in import_data:
+                    st.session_state.vocabulary = VocabularyStore.from_records(import_data["vocabulary"], topics)
+                    st.session_state.vocab_index.clear()
+                if "stats" in import_data:
+                    st.session_state.stats.update(import_data["stats"])
+                if "daily_challenges" in import_data:
+                    st.session_state.daily_challenges = import_data["daily_challenges"]
+                    # Challenges from an earlier day are replaced on the next run
+                    st.session_state.challenges_date = import_data.get("export_date", "")[:10]
+                recheck_achievements()
             
-            st.success("✅ Data imported successfully!")
-            st.rerun()
+                st.success("✅ Data imported successfully!")
+                st.rerun()
             
-        except Exception as e:
-            st.error(f"❌ Error importing data: {str(e)}")
+            except Exception as e:
+                st.error(f"❌ Error importing data: {str(e)}")
+
+render_data_management()
 
+# Rerun timing for the whole script, plus the regions that ran since the last full run
+st.session_state.in_full_run = False
+if measure_reruns:
+    record_render_time("Full app", time.perf_counter() - script_start_time, "full run")
+    with st.expander("⏱️ Rerun Timings", expanded=True):
+        st.caption("Partial reruns are on" if use_fragments else "Partial reruns are off - every interaction re-executes the whole script")
+        st.dataframe(pd.DataFrame(st.session_state.render_timings[::-1]), use_container_width=True, hide_index=True)
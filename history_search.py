@@ -0,0 +1,197 @@
+# Full-text search over conversation history
+#
+# Positional inverted index with German-aware normalization. Messages are
+# added one at a time as the conversation grows, so nothing is ever rebuilt
+# on a rerun. Queries are ranked with BM25 and may contain "quoted phrases".
+# Each term's postings are packed into one flat integer array, since the
+# index covers every message including the ones spilled to disk.
+
+import heapq
+import math
+import re
+import sys
+from array import array
+
+from text_folding import fold_term
+
+TOKEN_PATTERN = re.compile(r"\w+(?:-\w+)*")
+PHRASE_PATTERN = re.compile(r'"([^"]+)"')
+VOCAB_TAG_PATTERN = re.compile(r"\[VOCAB:\s*")
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    # Hyphenated compounds ("E-Mail", "Baden-Württemberg") are indexed as the
+    # whole word at the position of the first part; the parts follow after it.
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(VOCAB_TAG_PATTERN.sub(" ", text)):
+        word = fold_term(match.group())
+        if "-" in word:
+            parts = [part for part in word.split("-") if part]
+            tokens.append(word.replace("-", ""))
+            tokens.extend(parts)
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def parse_query(query):
+    phrases = [tokenize(phrase) for phrase in PHRASE_PATTERN.findall(query)]
+    phrases = [phrase for phrase in phrases if phrase]
+    terms = tokenize(PHRASE_PATTERN.sub(" ", query))
+    for phrase in phrases:
+        terms.extend(phrase)
+    return list(dict.fromkeys(terms)), [phrase for phrase in phrases if len(phrase) > 1]
+
+
+def decode_postings(packed):
+    # (message_id, count, position * count) records -> {message_id: positions}
+    docs = {}
+    index = 0
+    while index < len(packed):
+        count = packed[index + 1]
+        docs[packed[index]] = packed[index + 2:index + 2 + count]
+        index += 2 + count
+    return docs
+
+
+class HistoryIndex:
+    def __init__(self):
+        # term -> array of (message_id, count, position * count) records
+        self.postings = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+        # Running size estimate of the packed arrays and term keys
+        self.postings_bytes = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, message_id, text):
+        if message_id in self.doc_lengths:
+            self.remove(message_id, text)
+        tokens = tokenize(text)
+        positions = {}
+        for position, term in enumerate(tokens):
+            positions.setdefault(term, []).append(position)
+        for term, term_positions in positions.items():
+            packed = self.postings.get(term)
+            if packed is None:
+                packed = self.postings[term] = array("I")
+                self.postings_bytes += sys.getsizeof(term) + sys.getsizeof(packed)
+            packed.append(message_id)
+            packed.append(len(term_positions))
+            packed.extend(term_positions)
+            self.postings_bytes += (2 + len(term_positions)) * packed.itemsize
+        self.doc_lengths[message_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, message_id, text):
+        for term in set(tokenize(text)):
+            packed = self.postings.get(term)
+            if packed is None:
+                continue
+            kept = array("I")
+            for doc, positions in decode_postings(packed).items():
+                if doc != message_id:
+                    kept.append(doc)
+                    kept.append(len(positions))
+                    kept.extend(positions)
+            self.postings_bytes -= (len(packed) - len(kept)) * packed.itemsize
+            if kept:
+                self.postings[term] = kept
+            else:
+                del self.postings[term]
+                self.postings_bytes -= sys.getsizeof(term) + sys.getsizeof(kept)
+        self.total_length -= self.doc_lengths.pop(message_id, 0)
+
+    def clear(self):
+        self.postings.clear()
+        self.doc_lengths.clear()
+        self.total_length = 0
+        self.postings_bytes = 0
+
+    def memory_size(self):
+        # Approximate bytes held by the index, for the session memory budget
+        doc_lengths_bytes = sys.getsizeof(self.doc_lengths) + len(self.doc_lengths) * 2 * sys.getsizeof(2 ** 20)
+        return sys.getsizeof(self.postings) + self.postings_bytes + doc_lengths_bytes
+
+    def search(self, query, page=1, page_size=10):
+        # Returns (total_hits, [(message_id, score), ...]) for the requested page
+        terms, phrases = parse_query(query)
+        if not terms:
+            return 0, []
+
+        posting_lists = []
+        for term in terms:
+            packed = self.postings.get(term)
+            if not packed:
+                return 0, []
+            posting_lists.append((term, decode_postings(packed)))
+
+        # Intersect starting from the rarest term to keep candidate sets small
+        posting_lists.sort(key=lambda item: len(item[1]))
+        candidates = set(posting_lists[0][1])
+        for _, docs in posting_lists[1:]:
+            candidates.intersection_update(docs)
+            if not candidates:
+                return 0, []
+
+        if phrases:
+            term_docs = dict(posting_lists)
+            candidates = [doc for doc in candidates
+                          if all(self._has_phrase(term_docs, doc, phrase) for phrase in phrases)]
+
+        scored = self._score(candidates, posting_lists)
+        # Only the pages up to the requested one need ordering; newer messages win ties
+        start = max(0, page - 1) * page_size
+        top = heapq.nlargest(start + page_size, scored.items(), key=lambda item: (item[1], item[0]))
+        return len(scored), top[start:]
+
+    def _has_phrase(self, term_docs, message_id, phrase):
+        starts = set(term_docs[phrase[0]][message_id])
+        for offset, term in enumerate(phrase[1:], 1):
+            positions = term_docs[term][message_id]
+            starts.intersection_update(position - offset for position in positions)
+            if not starts:
+                return False
+        return True
+
+    def _score(self, candidates, posting_lists):
+        doc_count = len(self.doc_lengths)
+        avg_length = max(self.total_length / doc_count, 1) if doc_count else 1
+        doc_lengths = self.doc_lengths
+        weights = [
+            (docs, math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5)) * (BM25_K1 + 1))
+            for _, docs in posting_lists
+        ]
+        length_base = BM25_K1 * (1 - BM25_B)
+        length_scale = BM25_K1 * BM25_B / avg_length
+        scores = {}
+        for doc in candidates:
+            length_norm = length_base + length_scale * doc_lengths[doc]
+            score = 0.0
+            for docs, weight in weights:
+                tf = len(docs[doc])
+                score += weight * tf / (tf + length_norm)
+            scores[doc] = score
+        return scores
+
+
+def highlight_snippet(text, query, width=120):
+    # Short excerpt around the first matching word, for result lists
+    terms, _ = parse_query(query)
+    if not terms:
+        return text[:width]
+    wanted = set(terms)
+    for match in TOKEN_PATTERN.finditer(text):
+        if fold_term(match.group()) in wanted or any(
+            fold_term(part) in wanted for part in match.group().split("-")
+        ):
+            start = max(0, match.start() - width // 3)
+            snippet = text[start:start + width]
+            return ("…" if start > 0 else "") + snippet + ("…" if start + width < len(text) else "")
+    return text[:width]
@@ -0,0 +1,53 @@
+# Offline German/English language identification
+#
+# Character 1-3-gram naive Bayes model. The per-language log-probabilities
+# are precomputed by build_lang_model.py from the corpora in lang_data/ and
+# stored as a single table of German-minus-English log-odds per n-gram, so
+# classifying a sentence is one dict lookup per n-gram.
+
+import json
+import os
+import re
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lang_model.json")
+NGRAM_ORDERS = (1, 2, 3)
+NON_LETTER_PATTERN = re.compile(r"[^a-zäöüß]+")
+
+
+def extract_ngrams(text):
+    # Lowercased letters only, words padded with spaces so edges get their own n-grams
+    cleaned = " " + NON_LETTER_PATTERN.sub(" ", text.lower()).strip() + " "
+    grams = []
+    for order in NGRAM_ORDERS:
+        grams.extend(cleaned[i:i + order] for i in range(len(cleaned) - order + 1))
+    return [gram for gram in grams if gram.strip()]
+
+
+class LanguageIdentifier:
+    def __init__(self, log_odds, unseen_log_odds, prior_log_odds=0.0):
+        self.log_odds = log_odds
+        self.unseen_log_odds = unseen_log_odds
+        self.prior_log_odds = prior_log_odds
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with open(path, encoding="utf-8") as model_file:
+            model = json.load(model_file)
+        return cls(model["log_odds"], model["unseen_log_odds"], model.get("prior_log_odds", 0.0))
+
+    def score(self, text):
+        # Positive means German, negative English; normalized per n-gram
+        grams = extract_ngrams(text)
+        if not grams:
+            return 0.0
+        log_odds = self.log_odds
+        unseen = self.unseen_log_odds
+        total = self.prior_log_odds
+        for gram in grams:
+            total += log_odds.get(gram, unseen)
+        return total / len(grams)
+
+    def identify(self, text):
+        # Returns ("de" | "en", confidence); confidence is 0.0 for text without letters
+        score = self.score(text)
+        return ("de" if score > 0 else "en"), abs(score)
@@ -0,0 +1,267 @@
+# Concurrent-session load test for german_chatbot.py
+#
+# Drives N simulated learners through the real app script with Streamlit's
+# AppTest, all in this one process, so the numbers describe what a single
+# server process can take. OpenAI, gTTS and the translator are replaced by
+# stubs that only sleep for a configurable latency, so no API keys or
+# network are needed.
+#
+# Usage: python load_test.py --sessions 20 --rounds 3 --openai-latency 0.8
+
+import argparse
+import gc
+import itertools
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_SCRIPT = os.path.join(APP_DIR, "german_chatbot.py")
+
+# Scripted learner: (step name, action) - one round of a typical session
+SESSION_SCRIPT = [
+    ("send", "Hallo! Ich möchte heute über Essen sprechen."),
+    ("send", "Was isst man in Bayern zum Frühstück?"),
+    ("translate", "Ich habe gestern einen Apfelstrudel gegessen."),
+    ("send", "Kannst du mir eine Grammatikübung geben?"),
+    ("quiz", None),
+    ("tabs", None),
+    ("export", None),
+]
+
+
+def install_service_stubs(openai_latency, tts_latency, translate_latency):
+    # Fake openai / gtts / deep_translator modules picked up by the app's imports
+    word_ids = itertools.count()
+
+    class Completions:
+        def create(self, model, messages, **kwargs):
+            time.sleep(openai_latency)
+            n = next(word_ids)
+            content = (
+                f"Sehr gut! Das ist ein [VOCAB: Wort{n} - word{n}] und ein "
+                f"[VOCAB: Begriff{n} - term{n}]. Möchtest du eine Übung machen?"
+            )
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    class OpenAI:
+        def __init__(self, api_key=None, **kwargs):
+            self.chat = SimpleNamespace(completions=Completions())
+
+    class gTTS:
+        def __init__(self, text, lang="de", slow=False):
+            self.text = text
+
+        def write_to_fp(self, fp):
+            time.sleep(tts_latency)
+            fp.write(b"ID3" + bytes(min(len(self.text) * 200, 64 * 1024)))
+
+    class GoogleTranslator:
+        def __init__(self, source="auto", target="en"):
+            self.target = target
+
+        def translate(self, text):
+            time.sleep(translate_latency)
+            return f"[{self.target}] {text}"
+
+    for name, attributes in (
+        ("openai", {"OpenAI": OpenAI}),
+        ("gtts", {"gTTS": gTTS}),
+        ("deep_translator", {"GoogleTranslator": GoogleTranslator}),
+    ):
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+
+
+def share_script_bytecode():
+    # AppTest builds a fresh ScriptCache on every run, so each rerun recompiles the
+    # script. A real server compiles once, and concurrent ast parsing can also
+    # crash CPython 3.11. Route every AppTest through one shared, locked cache.
+    from streamlit.runtime.scriptrunner import script_cache
+
+    shared_cache = script_cache.ScriptCache()
+    original_get_bytecode = script_cache.ScriptCache.get_bytecode
+
+    def get_shared_bytecode(self, script_path):
+        return original_get_bytecode(shared_cache, script_path)
+
+    script_cache.ScriptCache.get_bytecode = get_shared_bytecode
+
+
+def current_rss():
+    # Resident set size of this process in bytes
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def find_button(app, label):
+    # The history expanders reuse some labels with keys, prefer the main key-less button
+    matches = [button for button in app.button if button.label == label]
+    if not matches:
+        raise LookupError(f"Button {label!r} was not rendered")
+    return next((button for button in matches if not button.key), matches[0])
+
+
+def run_session(session_number, rounds, timeout, latencies, errors):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_SCRIPT, default_timeout=timeout)
+    app.secrets["OPENAI_API_KEY"] = "load-test"
+
+    def timed(step, action):
+        start = time.perf_counter()
+        action()
+        latencies.append((step, time.perf_counter() - start))
+        for exception in app.exception:
+            errors.append(f"session {session_number} {step}: {exception.message}")
+
+    timed("start", app.run)
+    for round_number in range(rounds):
+        for step, text in SESSION_SCRIPT:
+            if step == "send":
+                message = f"{text} ({session_number}.{round_number})"
+                app.text_area(key="text_input").input(message)
+                timed(step, lambda: find_button(app, "📤 Send").click().run())
+            elif step == "translate":
+                app.text_area(key="text_input").input(text)
+                timed(step, lambda: find_button(app, "🔄 Translate").click().run())
+            elif step == "quiz":
+                timed(step, lambda: find_button(app, "📚 Vocabulary Quiz").click().run())
+                quiz_choice = [radio for radio in app.radio if radio.key == "quiz_choice"]
+                if quiz_choice:
+                    quiz_choice[0].set_value(quiz_choice[0].options[0])
+                    timed("quiz_answer", lambda: find_button(app, "Check Answer").click().run())
+            elif step == "tabs":
+                # All tabs render on every run; switching a tab is a plain rerun
+                timed(step, app.run)
+            elif step == "export":
+                timed(step, lambda: find_button(app, "📥 Export All Data").click().run())
+    return app
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    # Nearest-rank percentile
+    rank = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the German chatbot")
+    parser.add_argument("--sessions", type=int, default=10, help="simultaneous simulated learners")
+    parser.add_argument("--rounds", type=int, default=2, help="times each learner replays the script")
+    parser.add_argument("--openai-latency", type=float, default=0.5, help="stubbed gpt-4o latency in seconds")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="stubbed gTTS latency in seconds")
+    parser.add_argument("--translate-latency", type=float, default=0.1, help="stubbed translator latency in seconds")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    install_service_stubs(args.openai_latency, args.tts_latency, args.translate_latency)
+    share_script_bytecode()
+
+    # One warm-up session first: the app's first run imports pandas, plotly, numpy
+    # and builds the shared caches, which should not be billed to the sessions
+    warmup_errors = []
+    warmup_app = run_session(-1, 1, args.timeout, [], warmup_errors)
+    if warmup_errors:
+        print(f"Warm-up session failed: {warmup_errors[0]}")
+        return 1
+
+    latencies = []
+    errors = []
+    apps = []
+    lock = threading.Lock()
+    gc.collect()
+    rss_before = current_rss()
+    start = time.perf_counter()
+
+    def worker(session_number):
+        app = run_session(session_number, args.rounds, args.timeout, latencies, errors)
+        with lock:
+            # Keep sessions alive until the end so RSS reflects all of them
+            apps.append(app)
+
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        for future in [pool.submit(worker, number) for number in range(args.sessions)]:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(f"session crashed: {e!r}")
+
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    rss_after = current_rss()
+
+    all_latencies = [latency for _, latency in latencies]
+    by_step = {}
+    for step, latency in latencies:
+        by_step.setdefault(step, []).append(latency)
+
+    def summary(values):
+        return {
+            "count": len(values),
+            "mean_ms": statistics.fmean(values) * 1000 if values else 0.0,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+
+    report = {
+        "sessions": args.sessions,
+        "rounds": args.rounds,
+        "stub_latency_s": {
+            "openai": args.openai_latency,
+            "tts": args.tts_latency,
+            "translate": args.translate_latency,
+        },
+        "elapsed_s": elapsed,
+        "reruns": len(all_latencies),
+        "throughput_reruns_per_s": len(all_latencies) / elapsed if elapsed else 0.0,
+        "rerun_latency": summary(all_latencies),
+        "per_step": {step: summary(values) for step, values in sorted(by_step.items())},
+        "rss_before_mb": rss_before / (1024 * 1024),
+        "rss_after_mb": rss_after / (1024 * 1024),
+        "rss_growth_per_session_kb": (rss_after - rss_before) / max(1, len(apps)) / 1024,
+        "errors": errors,
+    }
+
+    print(f"Sessions: {args.sessions} x {args.rounds} rounds, {report['reruns']} reruns in {elapsed:.1f}s")
+    print(f"Throughput: {report['throughput_reruns_per_s']:.1f} reruns/s")
+    overall = report["rerun_latency"]
+    print(f"Rerun latency: p50 {overall['p50_ms']:.0f} ms | p95 {overall['p95_ms']:.0f} ms | p99 {overall['p99_ms']:.0f} ms")
+    print(f"{'step':<12} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for step, values in report["per_step"].items():
+        print(f"{step:<12} {values['count']:>6} {values['p50_ms']:>8.0f} {values['p95_ms']:>8.0f} {values['p99_ms']:>8.0f}")
+    print(f"RSS: {report['rss_before_mb']:.0f} MB -> {report['rss_after_mb']:.0f} MB "
+          f"({report['rss_growth_per_session_kb']:.0f} KB per session after warm-up)")
+    if errors:
+        print(f"{len(errors)} errors, first: {errors[0]}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+# Shared cache of tutor replies for near-duplicate user inputs
+#
+# Many learners open with the same few prompts ("Hallo!", "Lass uns über
+# Essen sprechen"). For short turns with little or no history, a reply given
+# to one learner is reused for another learner whose input is nearly the same
+# and who uses the same system prompt and had the same messages before it. Inputs are compared locally: each one
+# becomes a set of character trigrams with a MinHash signature, locality
+# sensitive hashing over signature bands finds the candidates, and the exact
+# Jaccard similarity of the trigram sets, against the similarity threshold,
+# ranks them. Trigrams cannot tell "cat" from "car" or "Dativ" from
+# "Akkusativ", so a hit also needs the same words in the same order, apart
+# from filler words, where a word may only differ by a spelling slip: one
+# letter in a word of five or more ("Wetter"/"Weter"), an apostrophe
+# ("geht's"/"gehts") or umlaut spelling ("möchte"/"moechte"). Entries expire
+# after a TTL and the cache is bounded by entry count and approximate size (LRU).
+
+import hashlib
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from text_folding import fold_text, trigrams
+
+APOSTROPHES = str.maketrans("", "", "'’`´")
+
+# Words that may differ between two inputs sharing a reply. Articles, pronouns
+# and question words change what a learner asks, so they are not in here.
+FILLER_WORDS = frozenset({
+    "bitte", "mal", "doch", "denn", "eigentlich", "halt", "eben", "nun", "also",
+    "hallo", "hi", "hey", "oh", "ok", "okay", "aeh", "aehm", "hm", "please", "so",
+    "just", "um", "uh", "well",
+})
+
+# Shorter words must match exactly, one letter there changes the meaning too often
+MIN_VARIANT_LENGTH = 5
+
+# Only short, low-context turns are shared, longer ones depend on the learner
+MAX_INPUT_WORDS = 12
+MAX_CONTEXT_MESSAGES = 2
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_TTL_SECONDS = 60 * 60
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# 16 bands of 4 rows: an input with Jaccard 0.8 to a cached one shares a band >99.9%
+# of the time, while unrelated inputs rarely become candidates
+NUM_PERMUTATIONS = 64
+BAND_ROWS = 4
+# Largest prime below 2**32: a * h + b stays inside uint64 for 32-bit shingle hashes
+HASH_PRIME = 4294967291
+# Fixed seed so signatures are comparable for the lifetime of the process
+_rng = random.Random(1337)
+PERMUTATION_A = np.array([_rng.randrange(1, HASH_PRIME) for _ in range(NUM_PERMUTATIONS)], dtype=np.uint64)
+PERMUTATION_B = np.array([_rng.randrange(0, HASH_PRIME) for _ in range(NUM_PERMUTATIONS)], dtype=np.uint64)
+
+
+def fold_input(text):
+    # "geht's" and "gehts" fold the same instead of splitting into two words
+    return fold_text(text.translate(APOSTROPHES))
+
+
+def content_words(folded):
+    return tuple(word for word in folded.split() if word not in FILLER_WORDS)
+
+
+def is_spelling_variant(first, second):
+    # True for equal words, or words of MIN_VARIANT_LENGTH+ letters one edit apart
+    if first == second:
+        return True
+    if min(len(first), len(second)) < MIN_VARIANT_LENGTH or abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+    position = 0
+    while position < len(first) and first[position] == second[position]:
+        position += 1
+    if len(first) == len(second):
+        return first[position + 1:] == second[position + 1:]
+    return first[position:] == second[position + 1:]
+
+
+def words_match(first, second):
+    return len(first) == len(second) and all(map(is_spelling_variant, first, second))
+
+
+def minhash_signature(shingle_set):
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set),
+                         dtype=np.uint64, count=len(shingle_set))
+    permuted = (PERMUTATION_A[:, None] * hashes[None, :] + PERMUTATION_B[:, None]) % HASH_PRIME
+    return tuple(permuted.min(axis=1).tolist())
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def prompt_key(system_prompt, messages_context=()):
+    # Replies are only shared between learners with the same system prompt variant
+    # and exactly the same earlier messages, since the reply was written for them
+    digest = hashlib.sha1(system_prompt.encode("utf-8"))
+    for message in messages_context:
+        digest.update(b"\0" + message["role"].encode("utf-8") + b"\0" + message["content"].encode("utf-8"))
+    return digest.hexdigest()
+
+
+def is_cacheable_turn(user_input, messages_context):
+    return len(user_input.split()) <= MAX_INPUT_WORDS and len(messages_context) <= MAX_CONTEXT_MESSAGES
+
+
+class CacheEntry:
+    __slots__ = ("namespace", "shingles", "words", "bands", "reply", "created", "latency", "size", "hits")
+
+    def __init__(self, namespace, shingle_set, words, bands, reply, created, latency):
+        self.namespace = namespace
+        self.shingles = shingle_set
+        self.words = words
+        self.bands = bands
+        self.reply = reply
+        self.created = created
+        self.latency = latency
+        self.size = (sys.getsizeof(reply) + sys.getsizeof(shingle_set)
+                     + sum(map(sys.getsizeof, shingle_set)) + sys.getsizeof(words)
+                     + sum(map(sys.getsizeof, words)) + len(bands) * 64)
+        self.hits = 0
+
+
+class ReplyCache:
+    def __init__(self, threshold=DEFAULT_THRESHOLD, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, clock=time.monotonic):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.lock = threading.Lock()
+        # entry id -> CacheEntry, least recently used first
+        self.entries = OrderedDict()
+        # (namespace, band number, band values) -> set of entry ids
+        self.buckets = {}
+        self.next_id = 0
+        self.total_bytes = 0
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.latency_saved = 0.0
+        self.lookup_seconds = 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, namespace, user_input, threshold=None):
+        # Returns the cached reply for the most similar input, or None
+        start = time.perf_counter()
+        threshold = self.threshold if threshold is None else threshold
+        folded = fold_input(user_input)
+        shingle_set = trigrams(folded)
+        words = content_words(folded)
+        bands = self._bands(namespace, minhash_signature(shingle_set)) if shingle_set else ()
+        with self.lock:
+            self.lookups += 1
+            now = self.clock()
+            best_id, best_score = None, threshold
+            candidates = set()
+            for band in bands:
+                candidates.update(self.buckets.get(band, ()))
+            for entry_id in candidates:
+                entry = self.entries[entry_id]
+                if now - entry.created > self.ttl_seconds:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                if not words_match(words, entry.words):
+                    continue
+                score = jaccard(shingle_set, entry.shingles)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            reply = None
+            if best_id is not None:
+                entry = self.entries[best_id]
+                self.entries.move_to_end(best_id)
+                entry.hits += 1
+                self.hits += 1
+                self.latency_saved += entry.latency
+                reply = entry.reply
+            self.lookup_seconds += time.perf_counter() - start
+            return reply
+
+    def put(self, namespace, user_input, reply, latency=0.0):
+        # latency is what producing the reply cost, credited on every later hit
+        folded = fold_input(user_input)
+        shingle_set = trigrams(folded)
+        if not shingle_set:
+            return
+        bands = self._bands(namespace, minhash_signature(shingle_set))
+        with self.lock:
+            entry = CacheEntry(namespace, shingle_set, content_words(folded), bands, reply, self.clock(), latency)
+            if entry.size > self.max_bytes:
+                return
+            entry_id = self.next_id
+            self.next_id += 1
+            self.entries[entry_id] = entry
+            self.total_bytes += entry.size
+            for band in bands:
+                self.buckets.setdefault(band, set()).add(entry_id)
+            self.stores += 1
+            self._enforce_bounds()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.buckets.clear()
+            self.total_bytes = 0
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "latency_saved_seconds": self.latency_saved,
+                "mean_lookup_ms": self.lookup_seconds / self.lookups * 1000 if self.lookups else 0.0,
+            }
+
+    def _bands(self, namespace, signature):
+        return [(namespace, start // BAND_ROWS, signature[start:start + BAND_ROWS])
+                for start in range(0, len(signature), BAND_ROWS)]
+
+    def _remove(self, entry_id):
+        entry = self.entries.pop(entry_id)
+        self.total_bytes -= entry.size
+        for band in entry.bands:
+            bucket = self.buckets.get(band)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self.buckets[band]
+
+    def _enforce_bounds(self):
+        # Drop expired entries, then least recently used ones until both bounds hold
+        now = self.clock()
+        for entry_id in [entry_id for entry_id, entry in self.entries.items()
+                         if now - entry.created > self.ttl_seconds]:
+            self._remove(entry_id)
+            self.expirations += 1
+        while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
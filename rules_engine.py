@@ -0,0 +1,65 @@
+# Event-driven achievements and daily challenges
+#
+# Achievements and challenges are declared as data: each one names the
+# counter it listens to. When a counter changes, only the rules subscribed
+# to that counter are looked at, and threshold rules are kept sorted. Each
+# session keeps a per-counter index of how many thresholds it has already
+# been awarded, so an event only looks past that index and costs the same
+# however many achievements are unlocked.
+
+import bisect
+
+
+class RuleEngine:
+    def __init__(self, achievements, challenges):
+        # counter -> thresholds (sorted) and the achievement names in the same order
+        self.thresholds = {}
+        self.achievement_names = {}
+        for achievement in sorted(achievements, key=lambda a: a["threshold"]):
+            self.thresholds.setdefault(achievement["counter"], []).append(achievement["threshold"])
+            self.achievement_names.setdefault(achievement["counter"], []).append(achievement["name"])
+        # counter -> names of the daily challenges it advances
+        self.challenge_names = {}
+        for challenge in challenges:
+            self.challenge_names.setdefault(challenge["counter"], set()).add(challenge["name"])
+
+    @property
+    def achievement_counters(self):
+        return list(self.thresholds)
+
+    def newly_unlocked(self, counter, value, progress):
+        # Achievements between the counter's awarded index and value; advances progress
+        thresholds = self.thresholds.get(counter)
+        if not thresholds:
+            return []
+        start = progress.get(counter, 0)
+        if start >= len(thresholds) or thresholds[start] > value:
+            return []
+        end = bisect.bisect_right(thresholds, value, start)
+        progress[counter] = end
+        return self.achievement_names[counter][start:end]
+
+    def resync(self, counter, value, unlocked, progress):
+        # Full check for when progress may be stale (import, achievements switched back
+        # on): every reached threshold that is not unlocked yet
+        thresholds = self.thresholds.get(counter)
+        if not thresholds:
+            return []
+        end = bisect.bisect_right(thresholds, value)
+        progress[counter] = end
+        unlocked = set(unlocked)
+        return [name for name in self.achievement_names[counter][:end] if name not in unlocked]
+
+    def advance_challenges(self, challenges, counter, delta):
+        # Adds delta to every challenge listening to counter, returns the ones just completed
+        names = self.challenge_names.get(counter)
+        if not names or delta <= 0:
+            return []
+        completed = []
+        for challenge in challenges:
+            if challenge["name"] in names:
+                before = challenge["progress"]
+                challenge["progress"] = before + delta
+                if before < challenge["target"] <= challenge["progress"]:
+                    completed.append(challenge["name"])
+        return completed
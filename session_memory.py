@@ -0,0 +1,225 @@
+# Per-session memory accounting with spill-to-disk for old messages
+#
+# MessageLog behaves like the list st.session_state.messages used to be, but
+# only keeps a hot tail in RAM. Older messages are appended to a JSONL file
+# in a per-session spill directory and read back by offset when a view asks
+# for them. MemoryGovernor is shared by all sessions of the process: it
+# tracks each session's footprint and spills the largest sessions first
+# whenever a session or the process goes over budget.
+#
+# Only messages are governed. The vocabulary and the search indexes are
+# counted in a session's footprint, so the panel and the budgets see them,
+# but they stay in RAM: a session whose indexes alone exceed its budget
+# stays over budget. The history index is packed (a few hundred bytes per
+# message) to keep that share small.
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import weakref
+from array import array
+
+# Messages always kept in RAM, enough for the chat context and recent view
+DEFAULT_HOT_MESSAGES = 40
+DEFAULT_SESSION_BUDGET = 8 * 1024 * 1024
+DEFAULT_TOTAL_BUDGET = 512 * 1024 * 1024
+
+
+def message_size(message):
+    # Rough in-memory size of one {"role": ..., "content": ...} dict
+    size = sys.getsizeof(message)
+    for key, value in message.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+
+def vocabulary_size(vocabulary):
+    # Rough in-memory size of a VocabularyStore (words plus column arrays), O(1)
+    size = sys.getsizeof(vocabulary.german) + sys.getsizeof(vocabulary.english) + vocabulary.word_bytes
+    for column in (vocabulary.date_learned, vocabulary.times_seen, vocabulary.difficulty,
+                   vocabulary.topic, vocabulary.mastery):
+        size += column.buffer_info()[1] * column.itemsize
+    size += sys.getsizeof(vocabulary.rows)
+    return size
+
+
+def _remove_spill_dir(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class MessageLog:
+    def __init__(self, messages=(), hot_messages=DEFAULT_HOT_MESSAGES, spill_dir=None):
+        self.hot_messages = hot_messages
+        self.spill_dir = spill_dir
+        self.lock = threading.RLock()
+        self.hot = []
+        self.hot_bytes = 0
+        # Byte offsets of spilled messages in the spill file
+        self.offsets = array("Q")
+        self.spill_path = None
+        self._finalizer = None
+        self.extend(messages)
+
+    def __len__(self):
+        # A spill moves messages from hot to offsets, read both under the lock
+        with self.lock:
+            return len(self.offsets) + len(self.hot)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        # Snapshot the length so appends during iteration are not picked up
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        with self.lock:
+            if isinstance(index, slice):
+                return [self[i] for i in range(*index.indices(len(self)))]
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            spilled = len(self.offsets)
+            if index >= spilled:
+                return self.hot[index - spilled]
+            return self._read_spilled(index)
+
+    @property
+    def spilled_count(self):
+        return len(self.offsets)
+
+    def append(self, message):
+        with self.lock:
+            self.hot.append(message)
+            self.hot_bytes += message_size(message)
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def clear(self):
+        with self.lock:
+            self.hot = []
+            self.hot_bytes = 0
+            self.offsets = array("Q")
+            if self.spill_path is not None:
+                open(self.spill_path, "w").close()
+
+    def replace(self, messages):
+        with self.lock:
+            self.clear()
+            self.extend(messages)
+
+    def to_list(self):
+        return self[:]
+
+    def spill(self, keep=None):
+        # Move everything but the last `keep` messages to disk, returns bytes freed
+        with self.lock:
+            keep = self.hot_messages if keep is None else keep
+            count = len(self.hot) - keep
+            if count <= 0:
+                return 0
+            path = self._ensure_spill_file()
+            freed = 0
+            with open(path, "ab") as spill_file:
+                position = spill_file.tell()
+                for message in self.hot[:count]:
+                    line = json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+                    spill_file.write(line)
+                    self.offsets.append(position)
+                    position += len(line)
+                    freed += message_size(message)
+            del self.hot[:count]
+            self.hot_bytes -= freed
+            return freed
+
+    def _read_spilled(self, index):
+        start = self.offsets[index]
+        with open(self.spill_path, "rb") as spill_file:
+            spill_file.seek(start)
+            return json.loads(spill_file.readline())
+
+    def _ensure_spill_file(self):
+        if self.spill_path is None:
+            directory = tempfile.mkdtemp(prefix="german_chatbot_", dir=self.spill_dir)
+            self.spill_path = os.path.join(directory, "messages.jsonl")
+            open(self.spill_path, "wb").close()
+            # Remove the spill file once the session's log is garbage collected
+            self._finalizer = weakref.finalize(self, _remove_spill_dir, directory)
+        return self.spill_path
+
+
+class MemoryGovernor:
+    def __init__(self, total_budget=DEFAULT_TOTAL_BUDGET, session_budget=DEFAULT_SESSION_BUDGET):
+        self.total_budget = total_budget
+        self.session_budget = session_budget
+        self.lock = threading.Lock()
+        # session id -> MessageLog, dropped automatically when the session goes away
+        self.logs = weakref.WeakValueDictionary()
+        self.other_bytes = {}
+        self.bytes_spilled = 0
+
+    def register(self, session_id, log):
+        with self.lock:
+            self.logs[session_id] = log
+            self.other_bytes.setdefault(session_id, 0)
+
+    def update(self, session_id, other_bytes=0):
+        # Record the session's non-message footprint (vocabulary etc.) and enforce budgets
+        with self.lock:
+            self.other_bytes[session_id] = other_bytes
+            log = self.logs.get(session_id)
+            if log is not None and self._session_bytes(session_id) > self.session_budget:
+                self.bytes_spilled += log.spill()
+            if self._total_bytes() > self.total_budget:
+                self._spill_largest()
+
+    def session_metrics(self, session_id):
+        with self.lock:
+            log = self.logs.get(session_id)
+            return {
+                "message_bytes": log.hot_bytes if log is not None else 0,
+                "other_bytes": self.other_bytes.get(session_id, 0),
+                "total_bytes": self._session_bytes(session_id),
+                "messages_in_memory": len(log.hot) if log is not None else 0,
+                "messages_on_disk": log.spilled_count if log is not None else 0,
+            }
+
+    def metrics(self):
+        with self.lock:
+            self._forget_closed_sessions()
+            return {
+                "sessions": len(self.logs),
+                "total_bytes": self._total_bytes(),
+                "total_budget": self.total_budget,
+                "bytes_spilled": self.bytes_spilled,
+            }
+
+    def _session_bytes(self, session_id):
+        log = self.logs.get(session_id)
+        return (log.hot_bytes if log is not None else 0) + self.other_bytes.get(session_id, 0)
+
+    def _total_bytes(self):
+        self._forget_closed_sessions()
+        return sum(self._session_bytes(session_id) for session_id in self.other_bytes)
+
+    def _forget_closed_sessions(self):
+        for session_id in [session_id for session_id in self.other_bytes if session_id not in self.logs]:
+            del self.other_bytes[session_id]
+
+    def _spill_largest(self):
+        # Biggest message logs first until the process is back under budget
+        logs = sorted(self.logs.items(), key=lambda item: item[1].hot_bytes, reverse=True)
+        total = self._total_bytes()
+        for _, log in logs:
+            if total <= self.total_budget:
+                break
+            freed = log.spill()
+            self.bytes_spilled += freed
+            total -= freed
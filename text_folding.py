@@ -0,0 +1,24 @@
+# Spelling folding shared by the search indexes and the reply cache
+#
+# Text is casefolded and umlauts are spelled out (ä/ae, ö/oe, ü/ue) so
+# learners can type without a German keyboard; casefold() already turns ß
+# into ss. Character trigrams of folded text tolerate typos.
+
+import re
+
+UMLAUT_FOLDING = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+NON_WORD_PATTERN = re.compile(r"[^\w]+")
+
+
+def fold_term(term):
+    return term.casefold().translate(UMLAUT_FOLDING)
+
+
+def fold_text(text):
+    # Runs of punctuation and whitespace become a single space
+    return NON_WORD_PATTERN.sub(" ", fold_term(text)).strip()
+
+
+def trigrams(folded):
+    padded = f"  {folded} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
@@ -0,0 +1,161 @@
+# Fuzzy vocabulary lookup
+#
+# Character-trigram index over the German and English fields of every
+# vocabulary entry. Spelling is folded first (ä/ae, ö/oe, ü/ue, ß/ss) so
+# learners can type without a German keyboard, trigram overlap tolerates
+# typos, and a sorted term list answers prefix queries with bisect.
+
+import bisect
+import sys
+from array import array
+from collections import Counter
+
+import text_folding
+from text_folding import trigrams
+
+# Minimum Dice similarity for a fuzzy (non-prefix) hit
+MIN_SIMILARITY = 0.35
+# Extra weight for exact and prefix matches so they sort ahead of fuzzy ones
+EXACT_BONUS = 2.0
+PREFIX_BONUS = 1.0
+
+
+def fold_text(text):
+    # Common leading articles are dropped so "der Hund" also matches "Hund"
+    text = text_folding.fold_text(text)
+    for article in ("der ", "die ", "das ", "to ", "the "):
+        if text.startswith(article):
+            return text[len(article):]
+    return text
+
+
+class VocabularyIndex:
+    # Each entry has up to two terms, German (term id 2 * entry_id) and English
+    # (2 * entry_id + 1). Entry ids come from the vocabulary store, so they are
+    # dense and per-term data lives in flat arrays indexed by term id.
+    def __init__(self):
+        # trigram -> array of term ids
+        self.postings = {}
+        # term id -> folded term (None for an empty or missing term)
+        self.folded = []
+        # term id -> number of distinct trigrams, for Dice scoring
+        self.gram_counts = array("H")
+        # entry id -> 1 if the entry is indexed
+        self.present = bytearray()
+        self.count = 0
+        # term ids sorted by folded term, for prefix lookups
+        self.sorted_ids = array("I")
+        # Running size estimate, kept up to date by add/remove
+        self.bytes = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, entry_id, german, english):
+        if entry_id < len(self.present) and self.present[entry_id]:
+            self.remove(entry_id)
+        self._ensure(entry_id)
+        self.present[entry_id] = 1
+        self.count += 1
+        seen = set()
+        for term_id, text in ((2 * entry_id, german), (2 * entry_id + 1, english)):
+            term = fold_text(text or "")
+            # An English gloss identical to the German word is indexed once
+            if not term or term in seen:
+                continue
+            seen.add(term)
+            grams = trigrams(term)
+            self.folded[term_id] = term
+            self.gram_counts[term_id] = min(len(grams), 0xFFFF)
+            for gram in grams:
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array("I")
+                    self.bytes += sys.getsizeof(gram) + sys.getsizeof(posting)
+                posting.append(term_id)
+            bisect.insort(self.sorted_ids, term_id, key=self.folded.__getitem__)
+            self.bytes += sys.getsizeof(term) + (len(grams) + 1) * self.sorted_ids.itemsize
+
+    def remove(self, entry_id):
+        if entry_id >= len(self.present) or not self.present[entry_id]:
+            return
+        self.present[entry_id] = 0
+        self.count -= 1
+        for term_id in (2 * entry_id, 2 * entry_id + 1):
+            term = self.folded[term_id]
+            if term is None:
+                continue
+            grams = trigrams(term)
+            for gram in grams:
+                posting = self.postings.get(gram)
+                if posting is not None and term_id in posting:
+                    posting.remove(term_id)
+                    if not posting:
+                        del self.postings[gram]
+                        self.bytes -= sys.getsizeof(gram) + sys.getsizeof(posting)
+            key = self.folded.__getitem__
+            position = bisect.bisect_left(self.sorted_ids, term, key=key)
+            while position < len(self.sorted_ids) and key(self.sorted_ids[position]) == term:
+                if self.sorted_ids[position] == term_id:
+                    del self.sorted_ids[position]
+                    break
+                position += 1
+            self.bytes -= sys.getsizeof(term) + (len(grams) + 1) * self.sorted_ids.itemsize
+            self.folded[term_id] = None
+            self.gram_counts[term_id] = 0
+
+    def clear(self):
+        self.__init__()
+
+    def memory_size(self):
+        # Approximate bytes held by the index, for the session memory budget
+        return (self.bytes + sys.getsizeof(self.postings) + sys.getsizeof(self.folded)
+                + len(self.gram_counts) * self.gram_counts.itemsize + len(self.present))
+
+    def search(self, query, page=1, page_size=10, min_similarity=MIN_SIMILARITY):
+        # Returns (total_hits, [entry_id, ...]) for the requested page
+        folded = fold_text(query)
+        if not folded:
+            return 0, []
+
+        scores = {}
+        # Prefix matches, also the only matches for one- and two-letter queries
+        key = self.folded.__getitem__
+        position = bisect.bisect_left(self.sorted_ids, folded, key=key)
+        while position < len(self.sorted_ids):
+            term_id = self.sorted_ids[position]
+            term = key(term_id)
+            if not term.startswith(folded):
+                break
+            bonus = EXACT_BONUS if term == folded else PREFIX_BONUS
+            entry_id = term_id // 2
+            scores[entry_id] = max(scores.get(entry_id, 0.0), bonus + len(folded) / len(term))
+            position += 1
+
+        if len(folded) >= 3:
+            query_grams = trigrams(folded)
+            overlap = Counter()
+            for gram in query_grams:
+                overlap.update(self.postings.get(gram, ()))
+            query_size = len(query_grams)
+            gram_counts = self.gram_counts
+            fuzzy = {}
+            for term_id, shared in overlap.items():
+                # Dice coefficient of the query against this one term, best term per entry
+                similarity = 2 * shared / (query_size + gram_counts[term_id])
+                entry_id = term_id // 2
+                if similarity >= min_similarity and similarity > fuzzy.get(entry_id, 0.0):
+                    fuzzy[entry_id] = similarity
+            for entry_id, similarity in fuzzy.items():
+                scores.setdefault(entry_id, similarity)
+
+        ranked = sorted(scores, key=lambda entry_id: (-scores[entry_id], entry_id))
+        start = max(0, page - 1) * page_size
+        return len(ranked), ranked[start:start + page_size]
+
+    def _ensure(self, entry_id):
+        missing = entry_id + 1 - len(self.present)
+        if missing > 0:
+            self.present.extend(bytes(missing))
+            self.folded.extend([None] * (2 * missing))
+            self.gram_counts.extend([0] * (2 * missing))
@@ -0,0 +1,275 @@
+# Compact vocabulary storage
+#
+# Each session used to hold its vocabulary as a list of dicts, repeating the
+# same keys, topic/difficulty/mastery names and date strings in every entry.
+# VocabularyStore keeps one column per field instead: the words themselves
+# in plain lists, everything else in typed arrays. Topic, difficulty and
+# mastery are small integer codes into per-store interned tables and dates
+# are day ordinals. to_records()/from_records() convert losslessly to and
+# from the JSON export format.
+
+import sys
+from array import array
+from datetime import date
+
+DATE_FORMAT = "%Y-%m-%d"
+# Interned value tables are seeded with the values the app uses; anything
+# else (e.g. from an imported file) is appended on first use.
+DIFFICULTIES = ("Beginner", "Intermediate", "Advanced")
+MASTERY_LEVELS = ("Learning", "Mastered")
+# Times seen before a word counts as mastered
+MASTERY_THRESHOLD = 3
+# Marks a field that was absent from an imported record, so it stays absent on export
+MISSING = object()
+RECORD_FIELDS = ("german", "english", "date_learned", "difficulty", "topic", "times_seen", "mastery_level")
+
+
+class InternTable:
+    # Code 0 is reserved for "field missing" so it round-trips as an absent key.
+    # limit is the number of codes the column's array type can hold.
+    __slots__ = ("values", "codes", "limit")
+
+    def __init__(self, values=(), limit=256):
+        self.values = [None]
+        self.codes = {}
+        self.limit = limit
+        for value in values:
+            self.code(value)
+
+    def fits(self, value):
+        return value is None or value in self.codes or len(self.values) < self.limit
+
+    def code(self, value):
+        if value is None:
+            return 0
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+
+def column_limit(column):
+    return 1 << (8 * column.itemsize)
+
+
+class VocabEntry:
+    # Read-only, dict-like view of one row, so templates can keep using
+    # vocab["german"] and vocab.get("topic", "N/A")
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key):
+        value = self.store.field(self.row, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self.store.field(self.row, key)
+        return default if value is None else value
+
+    def to_dict(self):
+        return self.store.record(self.row)
+
+
+class VocabularyStore:
+    def __init__(self, topics=()):
+        self.german = []
+        self.english = []
+        self.date_learned = array("I")
+        self.times_seen = array("I")
+        self.difficulty = array("B")
+        self.topic = array("H")
+        self.mastery = array("B")
+        # Difficulty and mastery have a handful of values, topics may grow with imports
+        self.difficulties = InternTable(DIFFICULTIES, column_limit(self.difficulty))
+        self.topics = InternTable(topics, column_limit(self.topic))
+        self.mastery_levels = InternTable(MASTERY_LEVELS, column_limit(self.mastery))
+        # german word -> row, replaces the linear scan for duplicates
+        self.rows = {}
+        # row -> fields the columns cannot represent (unknown keys, odd dates)
+        self.extras = {}
+        # Running size of the word strings, so memory accounting never walks them
+        self.word_bytes = 0
+
+    def __len__(self):
+        return len(self.german)
+
+    def __bool__(self):
+        return bool(self.german)
+
+    def __iter__(self):
+        for row in range(len(self.german)):
+            yield VocabEntry(self, row)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [VocabEntry(self, index) for index in range(*row.indices(len(self.german)))]
+        if row < 0:
+            row += len(self.german)
+        if not 0 <= row < len(self.german):
+            raise IndexError(row)
+        return VocabEntry(self, row)
+
+    def find(self, german):
+        return self.rows.get(german)
+
+    def append(self, german, english, date_learned=None, difficulty=None, topic=None,
+               times_seen=1, mastery_level="Learning"):
+        row = len(self.german)
+        self.german.append(german)
+        self.english.append(english)
+        self.word_bytes += sys.getsizeof(german) + sys.getsizeof(english)
+        self.date_learned.append((date_learned or date.today()).toordinal())
+        self.times_seen.append(times_seen)
+        self.difficulty.append(self.difficulties.code(difficulty))
+        self.topic.append(self.topics.code(topic))
+        self.mastery.append(self.mastery_levels.code(mastery_level))
+        if isinstance(german, str):
+            self.rows.setdefault(german, row)
+        return row
+
+    def mark_seen(self, row):
+        self.times_seen[row] += 1
+        if self.times_seen[row] >= MASTERY_THRESHOLD:
+            self.mastery[row] = self.mastery_levels.code("Mastered")
+
+    def field(self, row, key):
+        extras = self.extras.get(row)
+        if extras is not None and key in extras:
+            value = extras[key]
+            return None if value is MISSING else value
+        if key == "german":
+            return self.german[row]
+        if key == "english":
+            return self.english[row]
+        if key == "date_learned":
+            return date.fromordinal(self.date_learned[row]).strftime(DATE_FORMAT)
+        if key == "times_seen":
+            return self.times_seen[row]
+        if key == "difficulty":
+            return self.difficulties.values[self.difficulty[row]]
+        if key == "topic":
+            return self.topics.values[self.topic[row]]
+        if key == "mastery_level":
+            return self.mastery_levels.values[self.mastery[row]]
+        return None
+
+    def counts(self, key, default=None):
+        # Value counts for one field; missing values are counted under default
+        result = {}
+        if self.extras:
+            # Imported oddities live outside the columns, take the slow path
+            for row in range(len(self.german)):
+                value = self.field(row, key)
+                value = default if value is None else value
+                result[value] = result.get(value, 0) + 1
+            return result
+
+        # Count the integer codes first, decode each distinct code once
+        code_counts = {}
+        for code in self._column(key):
+            code_counts[code] = code_counts.get(code, 0) + 1
+        for code, count in code_counts.items():
+            if key == "date_learned":
+                value = date.fromordinal(code).strftime(DATE_FORMAT)
+            else:
+                value = self._table(key).values[code]
+            value = default if value is None else value
+            result[value] = result.get(value, 0) + count
+        return result
+
+    def record(self, row):
+        extras = self.extras.get(row, {})
+        record = {}
+        for key in RECORD_FIELDS:
+            if key not in extras:
+                record[key] = self.field(row, key)
+            elif extras[key] is not MISSING:
+                record[key] = extras[key]
+        for key, value in extras.items():
+            if key not in RECORD_FIELDS:
+                record[key] = value
+        return record
+
+    def to_records(self):
+        return [self.record(row) for row in range(len(self.german))]
+
+    @classmethod
+    def from_records(cls, records, topics=()):
+        store = cls(topics)
+        for record in records:
+            # Anything the columns cannot hold exactly is kept verbatim in extras
+            extras = {key: value for key, value in record.items() if key not in RECORD_FIELDS}
+            for key in RECORD_FIELDS:
+                if key not in record:
+                    extras[key] = MISSING
+                elif record[key] is None:
+                    extras[key] = None
+
+            learned = None
+            date_string = record.get("date_learned")
+            if date_string is not None:
+                try:
+                    learned = date.fromisoformat(date_string)
+                    if learned.strftime(DATE_FORMAT) != date_string:
+                        raise ValueError(date_string)
+                except (TypeError, ValueError):
+                    learned = None
+                    extras["date_learned"] = date_string
+
+            times_seen = record.get("times_seen")
+            if not isinstance(times_seen, int) or isinstance(times_seen, bool) or not 0 <= times_seen < 2 ** 32:
+                if times_seen is not None:
+                    extras["times_seen"] = times_seen
+                times_seen = 1
+
+            categories = {}
+            for key in ("difficulty", "topic", "mastery_level"):
+                value = record.get(key)
+                try:
+                    hash(value)
+                except TypeError:
+                    fits = False
+                else:
+                    # A full table (too many distinct values for the column width) spills to extras
+                    fits = store._table(key).fits(value)
+                if fits:
+                    categories[key] = value
+                else:
+                    extras[key] = value
+                    categories[key] = None
+
+            row = store.append(
+                record.get("german"),
+                record.get("english"),
+                learned,
+                categories["difficulty"],
+                categories["topic"],
+                times_seen,
+                categories["mastery_level"],
+            )
+            if extras:
+                store.extras[row] = extras
+        return store
+
+    def _column(self, key):
+        if key == "date_learned":
+            return self.date_learned
+        if key == "difficulty":
+            return self.difficulty
+        if key == "topic":
+            return self.topic
+        return self.mastery
+
+    def _table(self, key):
+        if key == "difficulty":
+            return self.difficulties
+        if key == "topic":
+            return self.topics
+        return self.mastery_levels
@@ -0,0 +1,116 @@
+# Incremental parser for [VOCAB: deutsches_wort - english_translation] tags
+#
+# Works on text chunks as they arrive (e.g. from a streamed GPT reply) and
+# emits clean display text plus vocabulary events as soon as each tag closes.
+# Tags split across chunks are buffered until they can be decided.
+
+TAG_OPEN = "[VOCAB:"
+# Separators between the German word and the translation. Only a dash with
+# spaces around it counts, so hyphenated words like "E-Mail" stay intact.
+TAG_SEPARATORS = (" - ", " – ")
+# Longest tag we are willing to buffer before giving up and emitting it as text
+MAX_TAG_LENGTH = 256
+# Markup removed from text that is going to be spoken
+SPEECH_MARKUP = ("**", "__", "~~")
+SPEECH_STRIP_CHARS = "[]()"
+
+
+def split_vocab_body(body):
+    for separator in TAG_SEPARATORS:
+        german, found, english = body.partition(separator)
+        if found and german.strip() and english.strip():
+            return german.strip(), english.strip()
+    return None
+
+
+class VocabTagParser:
+    def __init__(self, speech=False):
+        # speech=True also drops **, __, ~~ and brackets, like the old TTS clean-up
+        self.speech = speech
+        self.pending = ""
+
+    def feed(self, chunk):
+        text = self.pending + chunk
+        self.pending = ""
+        output = []
+        events = []
+        pos = 0
+        length = len(text)
+
+        while pos < length:
+            bracket = text.find("[", pos)
+            if bracket == -1:
+                self._emit(text[pos:], output, final=False)
+                break
+
+            self._emit(text[pos:bracket], output, final=True)
+
+            rest = text[bracket:bracket + len(TAG_OPEN)]
+            if len(rest) < len(TAG_OPEN) and TAG_OPEN.startswith(rest):
+                # Could still become a tag once the next chunk arrives
+                self.pending = text[bracket:]
+                return "".join(output), events
+            if rest != TAG_OPEN:
+                output.append("" if self.speech else "[")
+                pos = bracket + 1
+                continue
+
+            close = text.find("]", bracket + len(TAG_OPEN))
+            if close == -1:
+                if length - bracket <= MAX_TAG_LENGTH:
+                    self.pending = text[bracket:]
+                    return "".join(output), events
+                # Unterminated tag, treat the bracket as plain text
+                output.append("" if self.speech else "[")
+                pos = bracket + 1
+                continue
+
+            pair = split_vocab_body(text[bracket + len(TAG_OPEN):close])
+            if pair is None:
+                # Malformed tag, keep it as it was written
+                output.append(self._clean(text[bracket:close + 1]))
+            else:
+                events.append(pair)
+                output.append(pair[0])
+            pos = close + 1
+
+        return "".join(output), events
+
+    def flush(self):
+        # Anything still buffered at the end of the stream is plain text
+        text = self.pending
+        self.pending = ""
+        return self._clean(text)
+
+    def _emit(self, segment, output, final):
+        if not segment:
+            return
+        if self.speech and not final and segment[-1] in "*_~":
+            # Might be the first half of ** / __ / ~~ split across chunks
+            if self._pair_open(segment):
+                self.pending = segment[-1]
+                segment = segment[:-1]
+        output.append(self._clean(segment))
+
+    @staticmethod
+    def _pair_open(segment):
+        # "***" ends with one unpaired marker after removing the pairs
+        char = segment[-1]
+        run = len(segment) - len(segment.rstrip(char))
+        return run % 2 == 1
+
+    def _clean(self, text):
+        if not self.speech or not text:
+            return text
+        for markup in SPEECH_MARKUP:
+            text = text.replace(markup, "")
+        for char in SPEECH_STRIP_CHARS:
+            text = text.replace(char, "")
+        return text
+
+
+def parse_vocab_tags(text, speech=False):
+    # Convenience wrapper for complete texts
+    parser = VocabTagParser(speech=speech)
+    clean_text, events = parser.feed(text)
+    return clean_text + parser.flush(), events
@@ -0,0 +1,257 @@
+# Streaming voice input
+#
+# Audio arrives as chunks of 16-bit PCM. An energy-based voice activity
+# detector drops silence before anything reaches a recognizer, and every
+# finished speech segment is handed to a pluggable recognizer straight away.
+# Recognizers: OpenAI Whisper API (remote), local Whisper through
+# speech_recognition (offline) and a stub for tests and load runs.
+
+import importlib.util
+import io
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_WIDTH = 2  # 16-bit PCM
+FRAME_MS = 30
+# A frame counts as speech when it is this much louder than the noise floor...
+SPEECH_RATIO = 3.0
+# ...and above this absolute RMS, so near-digital silence never triggers
+MIN_SPEECH_RMS = 300.0
+# Speech needs this many consecutive loud frames to start a segment
+START_FRAMES = 3
+# Silence kept after speech before a segment is closed
+HANGOVER_MS = 400
+# Audio kept before the detected start so the first syllable is not clipped
+PREROLL_MS = 150
+MAX_SEGMENT_SECONDS = 15.0
+# speech_recognition's recognize_whisper needs these optional packages
+# (pip install openai-whisper soundfile, which pulls in torch)
+LOCAL_WHISPER_MODULES = ("speech_recognition", "whisper", "torch", "soundfile")
+
+
+class VoiceActivityDetector:
+    def __init__(self, sample_rate=16000):
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate * FRAME_MS // 1000 * SAMPLE_WIDTH
+        self.hangover_frames = HANGOVER_MS // FRAME_MS
+        self.preroll_frames = PREROLL_MS // FRAME_MS
+        self.max_segment_frames = int(MAX_SEGMENT_SECONDS * 1000 / FRAME_MS)
+        self.noise_floor = None
+        self.buffer = b""
+        self.preroll = []
+        self.segment = []
+        self.loud_run = 0
+        self.quiet_run = 0
+        self.in_speech = False
+        self.silence_frames = 0
+
+    def feed(self, chunk):
+        # Returns the speech segments (PCM bytes) that closed within this chunk
+        data = self.buffer + chunk
+        usable = len(data) - len(data) % self.frame_bytes
+        self.buffer = data[usable:]
+        if not usable:
+            return []
+
+        samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32)
+        frames = samples.reshape(-1, self.frame_bytes // SAMPLE_WIDTH)
+        energies = np.sqrt(np.mean(frames * frames, axis=1))
+
+        segments = []
+        for index, energy in enumerate(energies):
+            frame = data[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+            segment = self._process_frame(frame, float(energy))
+            if segment:
+                segments.append(segment)
+        return segments
+
+    def flush(self):
+        # Closes a segment still open at the end of the stream
+        self.buffer = b""
+        if self.in_speech and self.segment:
+            return self._close_segment()
+        self.silence_frames += len(self.preroll)
+        self.preroll = []
+        return None
+
+    @property
+    def silence_seconds(self):
+        return self.silence_frames * FRAME_MS / 1000
+
+    def _update_noise_floor(self, energy, loud):
+        # Quieter frames pull the floor down quickly, even during speech;
+        # it only creeps up on quiet frames outside speech
+        if energy < self.noise_floor:
+            self.noise_floor = 0.5 * self.noise_floor + 0.5 * energy
+        elif not loud and not self.in_speech:
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+
+    def _process_frame(self, frame, energy):
+        if self.noise_floor is None:
+            # Recording may start mid-sentence, so the first frame can't set the floor above MIN_SPEECH_RMS
+            self.noise_floor = min(energy, MIN_SPEECH_RMS)
+        loud = energy > max(MIN_SPEECH_RMS, self.noise_floor * SPEECH_RATIO)
+        self._update_noise_floor(energy, loud)
+
+        if not self.in_speech:
+            self.preroll.append(frame)
+            self.loud_run = self.loud_run + 1 if loud else 0
+            if self.loud_run >= START_FRAMES:
+                self.in_speech = True
+                self.segment = self.preroll[-(self.preroll_frames + START_FRAMES):]
+                self.silence_frames += len(self.preroll) - len(self.segment)
+                self.preroll = []
+                self.quiet_run = 0
+            elif len(self.preroll) > self.preroll_frames + START_FRAMES:
+                self.preroll.pop(0)
+                self.silence_frames += 1
+            return None
+
+        self.segment.append(frame)
+        self.quiet_run = 0 if loud else self.quiet_run + 1
+        if self.quiet_run >= self.hangover_frames or len(self.segment) >= self.max_segment_frames:
+            return self._close_segment()
+        return None
+
+    def _close_segment(self):
+        segment = b"".join(self.segment)
+        self.segment = []
+        self.in_speech = False
+        self.loud_run = 0
+        self.quiet_run = 0
+        return segment
+
+
+def pcm_to_wav(pcm, sample_rate):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(SAMPLE_WIDTH)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def wav_to_pcm(wav_bytes):
+    # Reads a WAV recording and returns (mono 16-bit PCM, sample rate)
+    with wave.open(io.BytesIO(wav_bytes), "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        sample_rate = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+    if sample_width != SAMPLE_WIDTH:
+        raise ValueError(f"Unsupported sample width: {sample_width * 8} bit")
+    if channels > 1:
+        samples = np.frombuffer(frames, dtype="<i2").reshape(-1, channels)
+        frames = samples.mean(axis=1).astype("<i2").tobytes()
+    return frames, sample_rate
+
+
+# Recognizers - anything with transcribe(pcm, sample_rate) -> str can be plugged in
+class StubRecognizer:
+    def __init__(self, transcripts=None, latency=0.0):
+        self.transcripts = list(transcripts or [])
+        self.latency = latency
+
+    def transcribe(self, pcm, sample_rate):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.transcripts:
+            return self.transcripts.pop(0)
+        return f"[{len(pcm) / (sample_rate * SAMPLE_WIDTH):.1f}s speech]"
+
+
+def local_whisper_available():
+    return all(importlib.util.find_spec(module) is not None for module in LOCAL_WHISPER_MODULES)
+
+
+class LocalWhisperRecognizer:
+    # Offline recognition via speech_recognition's local Whisper backend
+    def __init__(self, model="base", language="german"):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        self.model = model
+        self.language = language
+
+    def transcribe(self, pcm, sample_rate):
+        audio = self.sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH)
+        try:
+            return self.recognizer.recognize_whisper(audio, model=self.model, language=self.language).strip()
+        except self.sr.UnknownValueError:
+            return ""
+
+
+class OpenAIWhisperRecognizer:
+    def __init__(self, client, model="whisper-1", language="de"):
+        self.client = client
+        self.model = model
+        self.language = language
+
+    def transcribe(self, pcm, sample_rate):
+        result = self.client.audio.transcriptions.create(
+            model=self.model,
+            file=("segment.wav", pcm_to_wav(pcm, sample_rate)),
+            language=self.language,
+        )
+        return result.text.strip()
+
+
+class VoiceInputPipeline:
+    def __init__(self, recognizer, sample_rate=16000):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.vad = VoiceActivityDetector(sample_rate)
+        self.audio_seconds = 0.0
+        self.speech_seconds = 0.0
+        self.processing_seconds = 0.0
+        self.segments = 0
+
+    def feed(self, chunk):
+        # Returns the transcripts of the speech segments completed by this chunk
+        start = time.perf_counter()
+        self.audio_seconds += len(chunk) / (self.sample_rate * SAMPLE_WIDTH)
+        transcripts = [self._recognize(segment) for segment in self.vad.feed(chunk)]
+        self.processing_seconds += time.perf_counter() - start
+        return [text for text in transcripts if text]
+
+    def flush(self):
+        start = time.perf_counter()
+        segment = self.vad.flush()
+        transcripts = [self._recognize(segment)] if segment else []
+        self.processing_seconds += time.perf_counter() - start
+        return [text for text in transcripts if text]
+
+    @property
+    def real_time_factor(self):
+        # Processing time per second of audio; below 1.0 keeps up with live speech
+        return self.processing_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+    def metrics(self):
+        return {
+            "audio_seconds": self.audio_seconds,
+            "speech_seconds": self.speech_seconds,
+            "silence_skipped_seconds": self.vad.silence_seconds,
+            "segments": self.segments,
+            "processing_seconds": self.processing_seconds,
+            "real_time_factor": self.real_time_factor,
+        }
+
+    def _recognize(self, segment):
+        self.segments += 1
+        self.speech_seconds += len(segment) / (self.sample_rate * SAMPLE_WIDTH)
+        return self.recognizer.transcribe(segment, self.sample_rate)
+
+
+def transcribe_recording(wav_bytes, recognizer, chunk_seconds=0.5):
+    # Streams a finished recording through the pipeline in fixed-size chunks
+    pcm, sample_rate = wav_to_pcm(wav_bytes)
+    pipeline = VoiceInputPipeline(recognizer, sample_rate)
+    chunk_bytes = int(sample_rate * chunk_seconds) * SAMPLE_WIDTH
+    transcripts = []
+    for offset in range(0, len(pcm), chunk_bytes):
+        transcripts.extend(pipeline.feed(pcm[offset:offset + chunk_bytes]))
+    transcripts.extend(pipeline.flush())
+    return transcripts, pipeline.metrics()